@@ -1,15 +1,22 @@
 from fastapi import FastAPI, Query
 from pydantic import BaseModel
-from sentence_transformers import SentenceTransformer, util
-import requests
+from sentence_transformers import SentenceTransformer
+from collections import OrderedDict
+import numpy as np
+import hashlib
+import json
 import math
+import os
 import random
+import sqlite3
+import threading
 from typing import List, Dict
 
 app = FastAPI()
 
 # Load SBERT model
-model = SentenceTransformer("all-mpnet-base-v2")
+MODEL_NAME = "all-mpnet-base-v2"
+model = SentenceTransformer(MODEL_NAME)
 
 # Predefined degree rankings (local hierarchy)
 degree_rank = {
@@ -18,72 +25,311 @@ degree_rank = {
     "BTech": 3, "BE": 3, "BSc": 2, "BCA": 1, "Diploma": 0.5
 }
 
-# Synonyms for normalization
+# Synonyms and common spellings, each mapped to a degree_rank entry
 degree_synonyms = {
     "B.E.": "BE",
     "B.Sc.": "BSc",
     "M.Sc.": "MSc",
     "Master of Science": "MSc",
     "Bachelor of Technology": "BTech",
+    "Ph.D.": "PhD",
+    "Doctorate": "PhD",
+    "Doctor of Philosophy": "PhD",
+    "M.Tech.": "MTech",
+    "Master of Technology": "MTech",
+    "Master of Engineering": "MTech",
+    "M.S.": "MS",
+    "Master of Computer Applications": "MCA",
+    "B.Tech.": "BTech",
+    "Bachelor of Engineering": "BE",
+    "Bachelor of Science": "BSc",
+    "Bachelor of Computer Applications": "BCA",
+    "Diploma in Engineering": "Diploma",
+    "Polytechnic Diploma": "Diploma",
 }
 
+def lexicon_key(degree):
+    """Casefold a degree and drop punctuation and spaces, so "M.Tech." and "m tech" share a key."""
+    return "".join(ch for ch in degree.casefold() if ch.isalnum())
+
+def build_degree_lexicon():
+    """Compile every rank entry and synonym into {lexicon key: (canonical degree, rank)}."""
+    lexicon = {lexicon_key(name): (name, rank) for name, rank in degree_rank.items()}
+    for spelling, name in degree_synonyms.items():
+        lexicon[lexicon_key(spelling)] = (name, degree_rank[name])
+    return lexicon
+
+degree_lexicon = build_degree_lexicon()
+
 def normalize_degree(degree):
-    """Normalize degree by removing dots, spaces, and handling synonyms."""
-    degree = degree.replace(".", "").strip().lower()  # Convert to lowercase for consistency
-    return degree_synonyms.get(degree, degree).lower()
+    """Canonical degree name if the lexicon knows it, else the degree lowercased without dots."""
+    refresh_degree_state()
+    entry = degree_lexicon.get(lexicon_key(degree))
+    if entry is not None:
+        return entry[0]
+    return degree.replace(".", "").strip().lower()
 
-def fetch_global_rank(degree):
-    """Fetch degree hierarchy from Wikidata using SPARQL."""
-    query = f"""
-    SELECT ?degreeLabel ?parentLabel WHERE {{
-      ?degree wdt:P31 wd:Q189533;  # Instance of academic degree
-              rdfs:label "{degree}"@en.
-      OPTIONAL {{ ?degree wdt:P279 ?parent. }}
-      SERVICE wikibase:label {{ bd:serviceParam wikibase:language "en". }}
-    }}
-    """
-    url = "https://query.wikidata.org/sparql"
-    headers = {"Accept": "application/json"}
-    response = requests.get(url, headers=headers, params={"query": query})
+# Offline Wikidata degree hierarchy ({lowercased label: [parent labels]}), built by degree_hierarchy_import.py
+DEGREE_HIERARCHY_FILE = os.environ.get("DEGREE_HIERARCHY_FILE", "degree_hierarchy.json")
 
-    if response.status_code == 200:
-        data = response.json()
-        results = data.get("results", {}).get("bindings", [])
-        
-        parent_degrees = [entry["parentLabel"]["value"] for entry in results if "parentLabel" in entry]
+# Snapshot format this service understands; bump together with degree_hierarchy_import.py
+DEGREE_HIERARCHY_VERSION = 1
+
+# How many levels of parents to follow before giving up on a degree
+MAX_HIERARCHY_DEPTH = 4
+
+def load_degree_hierarchy(path=DEGREE_HIERARCHY_FILE):
+    """Load the degree hierarchy snapshot, or an empty one if it is missing or outdated."""
+    if not path or not os.path.exists(path):
+        print(f"No degree hierarchy snapshot at {path}, using embeddings only")
+        return {}
+    try:
+        with open(path, encoding="utf-8") as f:
+            snapshot = json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"Error loading degree hierarchy {path}: {e}")
+        return {}
+    if snapshot.get("version") != DEGREE_HIERARCHY_VERSION:
+        print(f"Ignoring degree hierarchy {path}: version {snapshot.get('version')}, expected {DEGREE_HIERARCHY_VERSION}")
+        return {}
+    return snapshot.get("degrees", {})
+
+degree_hierarchy = load_degree_hierarchy()
+
+def fetch_global_rank(degree):
+    """Rank a degree through its parents in the offline Wikidata hierarchy (no network)."""
+    labels = [degree.lower()]
+    seen = set(labels)
+    for _ in range(MAX_HIERARCHY_DEPTH):
+        parents = [parent for label in labels for parent in degree_hierarchy.get(label, [])]
+        for parent in parents:
+            entry = degree_lexicon.get(lexicon_key(parent))
+            if entry is not None:
+                return entry[1]  # Assign parent's rank
         
-        if parent_degrees:
-            for parent in parent_degrees:
-                if parent in degree_rank:
-                    return degree_rank[parent]  # Assign parent's rank
+        # Not ranked yet, so climb one level further up the hierarchy
+        labels = [parent.lower() for parent in parents if parent.lower() not in seen]
+        seen.update(labels)
+        if not labels:
+            break
     
     return None  # No known hierarchy
 
-def get_degree_score(degree):
-    """Returns predefined weight if known, else finds closest match."""
-    degree = normalize_degree(degree)
-    
-    if degree in degree_rank:
-        return degree_rank[degree]
-    
+# Bounds for the in-memory degree score and (candidate, requirement) similarity caches
+SCORE_CACHE_SIZE = int(os.environ.get("DEGREE_SCORE_CACHE_SIZE", "4096"))
+SIMILARITY_CACHE_SIZE = int(os.environ.get("DEGREE_SIMILARITY_CACHE_SIZE", "16384"))
+
+# Optional sqlite file shared by all worker processes on this host; empty disables it
+SHARED_CACHE_FILE = os.environ.get("DEGREE_SHARED_CACHE_FILE", "")
+
+def score_cache_version():
+    """Fingerprint of everything a cached score depends on, so stale shared entries are never read."""
+    state = json.dumps([MODEL_NAME, degree_rank, degree_synonyms, degree_hierarchy], sort_keys=True)
+    return hashlib.sha1(state.encode("utf-8")).hexdigest()[:16]
+
+class SharedScoreStore:
+    """Score table in a local sqlite file, so worker processes reuse each other's results."""
+
+    def __init__(self, path):
+        self.path = path
+        self.local = threading.local()
+
+    def connection(self):
+        # sqlite connections cannot cross threads, so each threadpool worker opens its own
+        conn = getattr(self.local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS scores ("
+                "cache TEXT, version TEXT, key TEXT, value TEXT, PRIMARY KEY (cache, version, key))"
+            )
+            self.local.conn = conn
+        return conn
+
+    def get(self, cache, version, key):
+        try:
+            row = self.connection().execute(
+                "SELECT value FROM scores WHERE cache = ? AND version = ? AND key = ?",
+                (cache, version, key),
+            ).fetchone()
+        except sqlite3.Error as e:
+            print(f"Error reading shared degree cache: {e}")
+            return None
+        return None if row is None else json.loads(row[0])
+
+    def put(self, cache, version, key, value):
+        try:
+            conn = self.connection()
+            conn.execute(
+                "INSERT OR REPLACE INTO scores (cache, version, key, value) VALUES (?, ?, ?, ?)",
+                (cache, version, key, json.dumps(value)),
+            )
+            conn.commit()
+        except sqlite3.Error as e:
+            print(f"Error writing shared degree cache: {e}")
+
+class ScoreCache:
+    """Bounded LRU of scores with hit/miss counters, optionally backed by the shared store."""
+
+    def __init__(self, name, maxsize, version, store=None):
+        self.name = name
+        self.maxsize = maxsize
+        self.version = version
+        self.store = store
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        """Return the cached score for key, or None."""
+        with self.lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return self.entries[key]
+            version = self.version
+
+        value = self.store.get(self.name, version, key) if self.store else None
+        with self.lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.shared_hits += 1
+                self.remember(key, value)
+        return value
+
+    def put(self, key, value):
+        with self.lock:
+            self.remember(key, value)
+            version = self.version
+        if self.store:
+            self.store.put(self.name, version, key, value)
+
+    def remember(self, key, value):
+        # Caller holds self.lock
+        self.entries[key] = value
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+
+    def reset(self, version):
+        """Drop every entry and switch to a new version, e.g. after degree_rank changed."""
+        with self.lock:
+            self.entries.clear()
+            self.version = version
+
+    def stats(self):
+        with self.lock:
+            lookups = self.hits + self.shared_hits + self.misses
+            return {
+                "size": len(self.entries),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "shared_hits": self.shared_hits,
+                "misses": self.misses,
+                "hit_rate": round((self.hits + self.shared_hits) / lookups, 4) if lookups else 0.0,
+            }
+
+shared_score_store = SharedScoreStore(SHARED_CACHE_FILE) if SHARED_CACHE_FILE else None
+degree_score_cache = ScoreCache("degree_score", SCORE_CACHE_SIZE, score_cache_version(), shared_score_store)
+similarity_cache = ScoreCache("similarity", SIMILARITY_CACHE_SIZE, score_cache_version(), shared_score_store)
+
+# Embeddings of the known degrees, as (degree names, normalized matrix)
+degree_matrix = None
+degree_matrix_lock = threading.Lock()
+
+def degree_tables_fingerprint():
+    """Copies of degree_rank and degree_synonyms, compared against the live tables on every lookup."""
+    return dict(degree_rank), dict(degree_synonyms)
+
+# Everything derived from the degree tables (lexicon, known-degree matrix, cache version)
+# was built from this fingerprint and is rebuilt together as soon as the tables change
+degree_state_fingerprint = degree_tables_fingerprint()
+degree_state_lock = threading.Lock()
+
+def degree_tables_changed():
+    rank, synonyms = degree_state_fingerprint
+    return degree_rank != rank or degree_synonyms != synonyms
+
+def refresh_degree_state():
+    """Rebuild the lexicon, matrix and score caches if degree_rank or degree_synonyms changed."""
+    global degree_state_fingerprint, degree_lexicon, degree_matrix
+    if not degree_tables_changed():
+        return
+    with degree_state_lock:
+        if not degree_tables_changed():
+            return
+        fingerprint = degree_tables_fingerprint()
+        degree_lexicon = build_degree_lexicon()
+        with degree_matrix_lock:
+            degree_matrix = None  # Re-embedded on the next estimate that needs it
+        version = score_cache_version()
+        degree_score_cache.reset(version)
+        similarity_cache.reset(version)
+        degree_state_fingerprint = fingerprint
+
+def get_degree_matrix():
+    """Return the known-degree embedding matrix, embedding it on first use."""
+    global degree_matrix
+    with degree_matrix_lock:
+        known_degrees = tuple(degree_rank.keys())
+        if degree_matrix is None or degree_matrix[0] != known_degrees:
+            embeddings = model.encode(list(known_degrees), normalize_embeddings=True)
+            degree_matrix = (known_degrees, np.asarray(embeddings))
+        return degree_matrix
+
+def estimate_degree_score(degree):
+    """Score for a normalized degree outside degree_rank, from the hierarchy or embeddings."""
     # Try fetching global equivalence
     global_rank = fetch_global_rank(degree)
     if global_rank is not None:
         return global_rank
-
-    # Compute similarity with known degrees
-    known_degrees = list(degree_rank.keys())
-    emb_degree = model.encode(degree, convert_to_tensor=True)
-    similarities = {d: util.pytorch_cos_sim(emb_degree, model.encode(d, convert_to_tensor=True)).item() for d in known_degrees}
+    
+    # Compute similarity with all known degrees at once: one encode, one matrix-vector product
+    known_degrees, embeddings = get_degree_matrix()
+    emb_degree = model.encode(degree, normalize_embeddings=True)
+    similarities = embeddings @ emb_degree
     
     # Find best matching known degree
-    best_match = max(similarities, key=similarities.get)
+    best = int(np.argmax(similarities))
     
     # Adjust score based on similarity percentage
-    return degree_rank[best_match] * similarities[best_match]
+    return degree_rank[known_degrees[best]] * float(similarities[best])
+
+def get_degree_score(degree):
+    """Returns predefined weight if known, else finds closest match."""
+    refresh_degree_state()
+    
+    # Known degrees and their spellings resolve with one lexicon lookup
+    entry = degree_lexicon.get(lexicon_key(degree))
+    if entry is not None:
+        return entry[1]
+    
+    # Only a cache miss reaches the hierarchy or the known-degree matrix
+    degree = normalize_degree(degree)
+    score = degree_score_cache.get(degree)
+    if score is None:
+        score = estimate_degree_score(degree)
+        degree_score_cache.put(degree, score)
+    return score
 
 def degree_similarity(candidate_degree, job_requirement):
     """Computes similarity score between candidate and job degree."""
+    refresh_degree_state()
+    
+    # A posting has few distinct (candidate, requirement) pairs, so most calls end here
+    key = f"{normalize_degree(candidate_degree)}\x1f{normalize_degree(job_requirement)}"
+    similarity = similarity_cache.get(key)
+    if similarity is None:
+        similarity = compute_degree_similarity(candidate_degree, job_requirement)
+        similarity_cache.put(key, similarity)
+    return similarity
+
+def compute_degree_similarity(candidate_degree, job_requirement):
+    """Scores a candidate degree against the job degree from their ranks."""
     candidate_score = get_degree_score(candidate_degree)
     job_score = get_degree_score(job_requirement)
 
@@ -142,6 +388,75 @@ def compare_degrees_list(job_requirement, candidate_degrees):
         "all_matches": matches
     }
 
+def degree_similarities(candidate_scores, job_score):
+    """Vectorized degree_similarity: the same penalty and bonus applied to an array of ranks."""
+    if job_score == 0:  # Avoid division by zero
+        return np.zeros(len(candidate_scores))
+    
+    degree_gap = np.abs(candidate_scores - job_score)
+    penalty = np.maximum(40, 100 - degree_gap * 10)  # Min 40
+    bonus = np.minimum(140, 100 + degree_gap * 10)  # Max 140
+    return np.where(candidate_scores < job_score, penalty, np.where(candidate_scores > job_score, bonus, 100.0))
+
+def rank_applicants_degrees(job_requirement, applicants, include_report=False):
+    """
+    Score every applicant's degrees against one job requirement and rank the applicants.
+    
+    Args:
+        job_requirement: The job required degree
+        applicants: List of (applicant_id, list of degrees)
+        include_report: Whether to generate report text for each applicant's best match
+        
+    Returns:
+        Dictionary with the number of distinct degrees and applicants sorted by best match
+    """
+    # Each distinct normalized degree is resolved once, however many applicants hold it
+    distinct = {}
+    degree_ids, owners, holders = [], [], []
+    for position, (_, degrees) in enumerate(applicants):
+        for degree in degrees:
+            if not degree.strip():
+                continue
+            degree_ids.append(distinct.setdefault(normalize_degree(degree), len(distinct)))
+            owners.append(position)
+            holders.append(degree)
+    
+    scores = np.array([get_degree_score(degree) for degree in distinct], dtype=float)
+    similarities = degree_similarities(scores, get_degree_score(job_requirement))[np.array(degree_ids, dtype=int)]
+    
+    # Sort by applicant, then by similarity (highest first); the first row of each applicant is its best degree
+    owners = np.array(owners, dtype=int)
+    order = np.lexsort((-similarities, owners))
+    firsts = order[np.r_[True, owners[order][1:] != owners[order][:-1]]] if len(order) else order
+    best = {int(owners[row]): row for row in firsts}
+    
+    ranking = []
+    for position, (applicant_id, _) in enumerate(applicants):
+        row = best.get(position)
+        best_match = holders[row] if row is not None else None
+        similarity = round(float(similarities[row]), 2) if row is not None else 0.0
+        
+        entry = {
+            "applicant_id": applicant_id,
+            "similarity": similarity,
+            "best_match": best_match,
+            "best_match_normalized": normalize_degree(best_match) if best_match else ""
+        }
+        if include_report:
+            entry["report"] = (
+                generate_report(best_match, job_requirement, similarity) if best_match
+                else "No candidate degrees were provided for comparison."
+            )
+        ranking.append(entry)
+    
+    # Highest similarity first
+    ranking.sort(key=lambda x: x["similarity"], reverse=True)
+    
+    return {
+        "distinct_degrees": len(distinct),
+        "applicants": ranking
+    }
+
 def generate_report(candidate_degree, job_requirement, similarity_score):
     """Generates a dynamic report about how well the candidate's degree matches the job requirement."""
     messages = []
@@ -304,6 +619,15 @@ class DegreeComparisonResponse(BaseModel):
     all_matches: List[Dict]
     report: str
 
+class ApplicantDegrees(BaseModel):
+    applicant_id: str
+    degrees: List[str]
+
+class BulkDegreeRequest(BaseModel):
+    job_requirement: str
+    applicants: List[ApplicantDegrees]
+    include_report: bool = False
+
 # Original endpoint (for backward compatibility)
 @app.get("/degree_similarity/")
 def degree_similarity_api(candidate_degree: str, job_requirement: str):
@@ -357,3 +681,32 @@ def compare_degrees_get(job_requirement: str, candidate_degrees: str):
     
     # Use the POST endpoint
     return compare_multiple_degrees(request)
+
+# Bulk endpoint for screening a whole applicant pool against one job requirement
+@app.post("/compare-degrees-bulk")
+def compare_degrees_bulk(request: BulkDegreeRequest):
+    """
+    Rank many applicants by how well their degrees match the job requirement.
+    
+    Each distinct degree across all applicants is resolved once and everyone is scored
+    in one vectorized pass. Reports are only generated when include_report is set.
+    """
+    result = rank_applicants_degrees(
+        request.job_requirement,
+        [(applicant.applicant_id, applicant.degrees) for applicant in request.applicants],
+        request.include_report
+    )
+    return {
+        "job_requirement": request.job_requirement,
+        "job_requirement_normalized": normalize_degree(request.job_requirement),
+        **result
+    }
+
+# Hit/miss counters for the degree caches
+@app.get("/stats")
+def stats():
+    return {
+        "degree_scores": degree_score_cache.stats(),
+        "similarities": similarity_cache.stats(),
+        "shared_cache_file": SHARED_CACHE_FILE or None
+    }
@@ -0,0 +1,98 @@
+import argparse
+import csv
+import json
+import os
+from datetime import datetime, timezone
+
+import requests
+
+# Must match DEGREE_HIERARCHY_VERSION in degree_check.py
+SNAPSHOT_VERSION = 1
+
+WIKIDATA_SPARQL_URL = "https://query.wikidata.org/sparql"
+
+# Every academic degree with its English label and the labels of the classes it is a subclass of
+HIERARCHY_QUERY = """
+SELECT ?degreeLabel ?parentLabel WHERE {
+  ?degree wdt:P31 wd:Q189533.  # Instance of academic degree
+  OPTIONAL { ?degree wdt:P279 ?parent. }
+  SERVICE wikibase:label { bd:serviceParam wikibase:language "en". }
+}
+"""
+
+def parse_sparql_json(data):
+    """Extract (degree label, parent label) pairs from SPARQL JSON results."""
+    pairs = []
+    for entry in data.get("results", {}).get("bindings", []):
+        if "degreeLabel" not in entry:
+            continue
+        parent = entry.get("parentLabel", {}).get("value")
+        pairs.append((entry["degreeLabel"]["value"], parent))
+    return pairs
+
+def parse_sparql_csv(path):
+    """Extract (degree label, parent label) pairs from a SPARQL CSV export."""
+    pairs = []
+    with open(path, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            if row.get("degreeLabel"):
+                pairs.append((row["degreeLabel"], row.get("parentLabel") or None))
+    return pairs
+
+def fetch_live(timeout):
+    """Run the hierarchy query against the Wikidata endpoint once."""
+    response = requests.get(
+        WIKIDATA_SPARQL_URL,
+        headers={"Accept": "application/json"},
+        params={"query": HIERARCHY_QUERY},
+        timeout=timeout,
+    )
+    response.raise_for_status()
+    return parse_sparql_json(response.json())
+
+def build_snapshot(pairs, source):
+    """Group pairs into {lowercased degree label: [parent labels]}."""
+    degrees = {}
+    for label, parent in pairs:
+        parents = degrees.setdefault(label.strip().lower(), [])
+        if parent and parent not in parents:
+            parents.append(parent)
+
+    return {
+        "version": SNAPSHOT_VERSION,
+        "source": source,
+        "created": datetime.now(timezone.utc).isoformat(),
+        "degrees": dict(sorted(degrees.items())),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the offline degree hierarchy snapshot used by degree_check.py")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--sparql-json", help="SPARQL JSON results of the hierarchy query")
+    source.add_argument("--sparql-csv", help="SPARQL CSV export with degreeLabel and parentLabel columns")
+    source.add_argument("--live", action="store_true", help="Query the Wikidata endpoint directly")
+    parser.add_argument("--timeout", type=float, default=60, help="Timeout in seconds for --live")
+    parser.add_argument("--output", default="degree_hierarchy.json", help="Snapshot file to write")
+    args = parser.parse_args()
+
+    if args.sparql_json:
+        with open(args.sparql_json, encoding="utf-8") as f:
+            pairs = parse_sparql_json(json.load(f))
+        snapshot = build_snapshot(pairs, os.path.basename(args.sparql_json))
+    elif args.sparql_csv:
+        snapshot = build_snapshot(parse_sparql_csv(args.sparql_csv), os.path.basename(args.sparql_csv))
+    else:
+        snapshot = build_snapshot(fetch_live(args.timeout), WIKIDATA_SPARQL_URL)
+
+    # Replace the snapshot atomically so a running service never reads half a file
+    tmp_path = f"{args.output}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(snapshot, f, indent=1, ensure_ascii=False)
+    os.replace(tmp_path, args.output)
+    print(f"Wrote {len(snapshot['degrees'])} degrees to {args.output}")
+
+if __name__ == "__main__":
+    main()
+
+# python degree_hierarchy_import.py --live
+# python degree_hierarchy_import.py --sparql-json query.json --output degree_hierarchy.json
@@ -1,16 +1,79 @@
 from fastapi import FastAPI, Query
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel
-from sentence_transformers import SentenceTransformer
-from sklearn.metrics.pairwise import cosine_similarity
 import random
 from difflib import SequenceMatcher
 from fuzzywuzzy import fuzz, process
 from typing import List, Dict
+from collections import OrderedDict, Counter
+import numpy as np
+import hashlib
+import json
+import threading
+import queue
+import time
+import asyncio
+from concurrent.futures import Future, InvalidStateError
+import os
+
+try:
+    from rapidfuzz import fuzz as rapid_fuzz, process as rapid_process, utils as rapid_utils
+except ImportError:  # Fuzzy scores are then computed pair by pair with fuzzywuzzy
+    rapid_process = None
 
 app = FastAPI()
 
-# Load a specialized model for academic/technical terms
-model = SentenceTransformer('allenai-specter')  # Optimized for scientific fields
+# Specialized model for academic/technical terms, loaded on the first semantic comparison.
+# A distilled model such as 'all-MiniLM-L6-v2' loads far faster at some cost in accuracy.
+MODEL_NAME = os.environ.get("MAJOR_MODEL", "allenai-specter")  # Optimized for scientific fields
+
+# Set to "1" to load the model and taxonomy in a background thread at startup
+MODEL_WARMUP = os.environ.get("MAJOR_MODEL_WARMUP", "0") == "1"
+
+model = None
+model_lock = threading.Lock()
+
+# Embeddings kept in memory, and an optional directory persisting them (unset disables the
+# disk layer; it holds one file per distinct major and is never pruned)
+EMBEDDING_CACHE_SIZE = 10000
+EMBEDDING_CACHE_DIR = os.environ.get("MAJOR_EMBEDDING_CACHE_DIR", "")
+
+embedding_cache = OrderedDict()
+embedding_cache_lock = threading.Lock()
+
+# Smallest number of majors scored against one string before fuzzy matching runs on all cores
+FUZZY_PARALLEL_THRESHOLD = 1000
+
+# Micro-batching of model calls: how long to wait for concurrent texts, and the largest batch
+BATCH_WINDOW_MS = float(os.environ.get("MAJOR_BATCH_WINDOW_MS", "5"))
+MAX_BATCH_SIZE = int(os.environ.get("MAJOR_MAX_BATCH_SIZE", "64"))
+
+# Candidate majors learned from confident semantic matches onto the taxonomy, stored as
+# {major: [canonical major, cosine]} and persisted between runs
+LEARNED_ALIASES_FILE = os.environ.get("MAJOR_LEARNED_ALIASES_FILE", "learned_major_aliases.json")
+
+# Minimum cosine similarity to a canonical major before an unknown major becomes its alias
+ALIAS_LEARN_THRESHOLD = float(os.environ.get("MAJOR_ALIAS_LEARN_THRESHOLD", "0.95"))
+
+# Pick report templates from a hash of the inputs, so identical comparisons give identical text
+DETERMINISTIC_REPORTS = os.environ.get("MAJOR_DETERMINISTIC_REPORTS", "1") == "1"
+
+# Reports kept for repeated evaluations (deterministic mode only)
+REPORT_CACHE_SIZE = 4096
+
+report_cache = OrderedDict()
+report_cache_lock = threading.Lock()
+
+# How many comparisons each stage of the scoring pipeline decided
+decision_counts = Counter()
+decision_counts_lock = threading.Lock()
+
+if EMBEDDING_CACHE_DIR:
+    try:
+        os.makedirs(EMBEDDING_CACHE_DIR, exist_ok=True)
+    except OSError as e:
+        print(f"Error creating embedding cache directory, keeping embeddings in memory only: {e}")
+        EMBEDDING_CACHE_DIR = ""
 
 # Common variations and abbreviations of majors for better matching
 major_aliases = {
@@ -53,6 +116,60 @@ major_aliases = {
     "hr": "human resources"
 }
 
+# Further fields recognized by the taxonomy besides the alias targets; extend as needed
+known_fields = [
+    "computer applications",
+    "data science",
+    "information security",
+    "cyber security",
+    "electronics engineering",
+    "aerospace engineering",
+    "industrial engineering",
+    "environmental science",
+    "applied mathematics",
+    "mathematics and computing",
+    "business analytics",
+    "commerce",
+    "law",
+    "medicine",
+    "nursing",
+    "pharmacy",
+    "architecture",
+    "design",
+    "journalism",
+    "education"
+]
+
+def load_learned_aliases():
+    """Load the persisted learned aliases, starting empty if there are none."""
+    if not os.path.exists(LEARNED_ALIASES_FILE):
+        return {}
+    try:
+        with open(LEARNED_ALIASES_FILE, 'r') as f:
+            aliases = json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"Error loading learned aliases: {e}")
+        return {}
+    
+    # Entries from older files carry no cosine and are relearned on their next semantic check
+    return {major: entry for major, entry in aliases.items() if isinstance(entry, list) and len(entry) == 2}
+
+def save_learned_aliases():
+    """Persist the learned aliases, merging entries other workers saved in the meantime."""
+    with learned_aliases_lock:
+        merged = {**load_learned_aliases(), **learned_aliases}
+        learned_aliases.update(merged)
+        tmp_path = f"{LEARNED_ALIASES_FILE}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, 'w') as f:
+                json.dump(merged, f, indent=2, sort_keys=True)
+            os.replace(tmp_path, LEARNED_ALIASES_FILE)
+        except OSError as e:
+            print(f"Error saving learned aliases: {e}")
+
+learned_aliases = load_learned_aliases()
+learned_aliases_lock = threading.Lock()
+
 def preprocess_major(major):
     """Standardize majors for consistent embeddings."""
     major = major.lower().strip()
@@ -64,58 +181,483 @@ def preprocess_major(major):
     
     return major
 
+def get_model():
+    """Load the sentence-transformer on first use, so startup never waits for it."""
+    global model
+    if model is None:
+        with model_lock:
+            if model is None:
+                from sentence_transformers import SentenceTransformer
+                model = SentenceTransformer(MODEL_NAME)
+    return model
+
+class EmbeddingBatcher:
+    """
+    Collects encode calls from concurrent requests into shared model batches.
+    
+    Callers wait on a future (blocking in encode, or awaiting the one submit
+    returns) while a single worker thread waits a few milliseconds after the
+    first request for others to arrive, encodes all of their distinct texts in
+    one model call and hands each caller its rows.
+    """
+    def __init__(self, window_ms, max_batch_size):
+        self.window = window_ms / 1000.0
+        self.max_batch_size = max_batch_size
+        self.requests = queue.Queue()
+        self.worker = None
+        self.worker_lock = threading.Lock()
+    
+    def submit(self, texts):
+        """Queue texts for the next batch and return the future of their embeddings."""
+        with self.worker_lock:
+            if self.worker is None:
+                self.worker = threading.Thread(target=self._run, daemon=True)
+                self.worker.start()
+        
+        future = Future()
+        self.requests.put((list(texts), future))
+        return future
+    
+    def encode(self, texts):
+        """Encode texts as part of the next batch and wait for the result."""
+        return self.submit(texts).result()
+    
+    def _collect(self):
+        """Block for one request, then gather more until the window closes or the batch is full."""
+        batch = [self.requests.get()]
+        size = len(batch[0][0])
+        deadline = time.monotonic() + self.window
+        while size < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self.requests.get(timeout=remaining))
+            except queue.Empty:
+                break
+            size += len(batch[-1][0])
+        return batch
+    
+    def _run(self):
+        while True:
+            try:
+                self._encode_batch(self._collect())
+            except Exception as e:
+                # The worker must outlive any error, or every later caller would wait forever
+                print(f"Error in embedding batcher: {e}")
+    
+    def _encode_batch(self, batch):
+        # Callers that were cancelled while queued (e.g. an aborted request) are dropped;
+        # the rest are marked running, so they can no longer be cancelled under us
+        batch = [(texts, future) for texts, future in batch if future.set_running_or_notify_cancel()]
+        if not batch:
+            return
+        
+        # Texts requested by several callers are encoded once
+        texts = list(dict.fromkeys(text for texts, _ in batch for text in texts))
+        try:
+            vectors = dict(zip(texts, get_model().encode(texts)))
+        except Exception as e:
+            for _, future in batch:
+                settle(future, exception=e)
+            return
+        
+        for texts, future in batch:
+            settle(future, result=np.array([vectors[text] for text in texts]))
+
+def settle(future, result=None, exception=None):
+    """Resolve a batch future, ignoring one that has already been resolved."""
+    try:
+        if exception is not None:
+            future.set_exception(exception)
+        else:
+            future.set_result(result)
+    except InvalidStateError:
+        pass
+
+embedding_batcher = EmbeddingBatcher(BATCH_WINDOW_MS, MAX_BATCH_SIZE)
+
+def embedding_key(text):
+    """Content address of an embedding: the model name plus the normalized text."""
+    return hashlib.sha256(f"{MODEL_NAME}\0{text}".encode()).hexdigest()
+
+def load_cached_embedding(key):
+    """Read an embedding from the disk layer, or None if it is not there."""
+    if not EMBEDDING_CACHE_DIR:
+        return None
+    try:
+        return np.load(os.path.join(EMBEDDING_CACHE_DIR, key + ".npy"))
+    except (OSError, ValueError):
+        return None
+
+def save_cached_embedding(key, vector):
+    """Write an embedding to the disk layer atomically so concurrent workers can share it."""
+    if not EMBEDDING_CACHE_DIR:
+        return
+    path = os.path.join(EMBEDDING_CACHE_DIR, key + ".npy")
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, "wb") as f:
+            np.save(f, vector)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        print(f"Error saving embedding cache: {e}")
+
+def lookup_embeddings(texts):
+    """Return (keys, cached vectors by key, {key: text} of the misses) for preprocessed majors."""
+    keys = [embedding_key(text) for text in texts]
+    vectors = {}
+
+    with embedding_cache_lock:
+        for key in keys:
+            if key in embedding_cache:
+                embedding_cache.move_to_end(key)
+                vectors[key] = embedding_cache[key]
+
+    # Unique misses, checked against the disk layer before falling back to the model
+    missing = {}
+    for text, key in zip(texts, keys):
+        if key not in vectors and key not in missing:
+            vector = load_cached_embedding(key)
+            if vector is None:
+                missing[key] = text
+            else:
+                vectors[key] = vector
+    return keys, vectors, missing
+
+def store_embeddings(keys, vectors, missing, encoded):
+    """Add freshly encoded misses to both cache layers and return the embeddings in key order."""
+    for key, vector in zip(missing, encoded):
+        vectors[key] = vector
+        save_cached_embedding(key, vector)
+
+    with embedding_cache_lock:
+        for key in set(keys):
+            embedding_cache[key] = vectors[key]
+            embedding_cache.move_to_end(key)
+        while len(embedding_cache) > EMBEDDING_CACHE_SIZE:
+            embedding_cache.popitem(last=False)
+
+    return np.array([vectors[key] for key in keys])
+
+def encode_majors(texts):
+    """
+    Embed preprocessed majors, serving repeats from an in-memory LRU backed by disk.
+
+    Only texts missing from both cache layers reach the model, in a single batch.
+    """
+    keys, vectors, missing = lookup_embeddings(texts)
+    encoded = embedding_batcher.encode(list(missing.values())) if missing else []
+    return store_embeddings(keys, vectors, missing, encoded)
+
+async def encode_majors_async(texts):
+    """encode_majors for the event loop: the model batch is awaited, so no thread waits on it."""
+    keys, vectors, missing = await run_in_threadpool(lookup_embeddings, texts)
+    if not missing:
+        return store_embeddings(keys, vectors, missing, [])
+    encoded = await asyncio.wrap_future(embedding_batcher.submit(list(missing.values())))
+    return await run_in_threadpool(store_embeddings, keys, vectors, missing, encoded)
+
+def normalize_rows(matrix):
+    """Scale each embedding to unit length so dot products are cosine similarities."""
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return matrix / np.where(norms == 0, 1, norms)
+
+def semantic_similarities(job_major_processed, candidate_majors_processed):
+    """Cosine similarity of one preprocessed job major to many candidates: one encode, one matmul."""
+    if not candidate_majors_processed:
+        return []
+    embeddings = normalize_rows(encode_majors([job_major_processed] + list(candidate_majors_processed)))
+    return (embeddings[1:] @ embeddings[0]).astype(float).tolist()
+
+def taxonomy_majors():
+    """Every canonical major: the alias targets plus the extra known fields."""
+    return sorted(set(major_aliases.values()) | set(known_fields))
+
+def build_major_taxonomy():
+    """Embed every canonical major once into a single normalized matrix."""
+    majors = taxonomy_majors()
+    return majors, normalize_rows(encode_majors(majors))
+
+taxonomy = None
+taxonomy_lock = threading.Lock()
+
+def get_major_taxonomy():
+    """Return (majors, matrix), embedding the taxonomy on first use."""
+    global taxonomy
+    if taxonomy is None:
+        with taxonomy_lock:
+            if taxonomy is None:
+                taxonomy = build_major_taxonomy()
+    return taxonomy
+
+def nearest_known_major(major):
+    """Resolve a major to the closest canonical major with one matrix-vector product."""
+    taxonomy_majors, taxonomy_matrix = get_major_taxonomy()
+    vector = normalize_rows(encode_majors([preprocess_major(major)]))[0]
+    scores = taxonomy_matrix @ vector
+    best = int(np.argmax(scores))
+    return taxonomy_majors[best], float(scores[best])
+
+def learn_aliases(majors_processed):
+    """
+    Record confident semantic matches of unknown candidate majors onto the taxonomy.
+    
+    Called for majors that just went through the semantic check, so their embeddings
+    are cache hits; the whole set is resolved with one matrix product. Each learned
+    major keeps the cosine it matched with, and a later comparison against that same
+    canonical major reuses the cosine instead of reaching the model again.
+    """
+    taxonomy_majors, taxonomy_matrix = get_major_taxonomy()
+    known = set(taxonomy_majors)
+    unknown = list(dict.fromkeys(m for m in majors_processed if m and m not in known and m not in learned_aliases))
+    if not unknown:
+        return
+    
+    scores = normalize_rows(encode_majors(unknown)) @ taxonomy_matrix.T
+    best = scores.argmax(axis=1)
+    
+    learned = False
+    for row, (major, index) in enumerate(zip(unknown, best)):
+        if scores[row, index] >= ALIAS_LEARN_THRESHOLD:
+            with learned_aliases_lock:
+                learned_aliases[major] = [taxonomy_majors[index], float(scores[row, index])]
+            learned = True
+    
+    if learned:
+        save_learned_aliases()
+
+def warm_up():
+    """Load the model and embed the taxonomy ahead of the first request."""
+    try:
+        get_major_taxonomy()
+    except Exception as e:
+        print(f"Error warming up model: {e}")
+
+if MODEL_WARMUP:
+    threading.Thread(target=warm_up, daemon=True).start()
+
 def get_string_similarity(str1, str2):
     """Calculate string-based similarity for handling slight spelling variations."""
     return SequenceMatcher(None, str1.lower(), str2.lower()).ratio()
 
-def get_fuzzy_similarity(str1, str2):
-    """Get fuzzy match score using multiple algorithms and return the best match."""
-    # Different fuzzy matching algorithms for different types of variations
-    ratio = fuzz.ratio(str1.lower(), str2.lower())
-    partial_ratio = fuzz.partial_ratio(str1.lower(), str2.lower())
-    token_sort_ratio = fuzz.token_sort_ratio(str1.lower(), str2.lower())
-    token_set_ratio = fuzz.token_set_ratio(str1.lower(), str2.lower())
+def get_fuzzy_similarities(query, choices):
+    """
+    Fuzzy match scores of one string against many, as an array of the best score per choice.
+    
+    Every string is lowercased once. With rapidfuzz the whole-string and token algorithms
+    score all choices in a single cdist call each; otherwise fuzzywuzzy is run pair by pair.
+    Partial matching always uses fuzzywuzzy (see below).
+    """
+    query = query.lower()
+    choices = [choice.lower() for choice in choices]
+    if not choices:
+        return np.zeros(0)
+    
+    if rapid_process is None:
+        # Different fuzzy matching algorithms for different types of variations
+        return np.array([
+            max(
+                fuzz.ratio(query, choice),
+                fuzz.partial_ratio(query, choice),
+                fuzz.token_sort_ratio(query, choice),
+                fuzz.token_set_ratio(query, choice)
+            ) for choice in choices
+        ]) / 100.0
     
-    # Return the highest matching score
-    return max(ratio, partial_ratio, token_sort_ratio, token_set_ratio) / 100.0
+    # Token scorers clean punctuation first, as fuzzywuzzy's full_process does
+    scorers = [
+        (rapid_fuzz.ratio, None),
+        (rapid_fuzz.token_sort_ratio, rapid_utils.default_process),
+        (rapid_fuzz.token_set_ratio, rapid_utils.default_process)
+    ]
+    # Worker threads only pay off for large lists; for a few pairs their startup dominates
+    workers = -1 if len(choices) >= FUZZY_PARALLEL_THRESHOLD else 1
+    # rapidfuzz's partial_ratio scores any short string found inside the other at 100,
+    # so abbreviations such as "ee" would match "civil engineering" through the fuzzy
+    # shortcut; fuzzywuzzy's scores those at 50 and leaves them to the semantic check
+    best = np.array([fuzz.partial_ratio(query, choice) for choice in choices], dtype=float)
+    for scorer, processor in scorers:
+        scores = rapid_process.cdist([query], choices, scorer=scorer, processor=processor, workers=workers)[0]
+        best = np.maximum(best, scores)
+    
+    # Whole percentages, matching fuzzywuzzy's integer scores
+    return np.round(best) / 100.0
 
-def compare_majors(job_major, candidate_major):
-    """Compare majors using multiple similarity methods and return the best score."""
-    # Prepare original and preprocessed versions
-    job_major_original = job_major
-    candidate_major_original = candidate_major
+def quick_compare_majors_batch(job_major, candidate_majors, stop_on_perfect=False):
+    """
+    Run the cheap checks of compare_majors for many candidate majors, cheapest first.
     
+    Stages: exact match of the lowercased strings, alias match after preprocessing,
+    fuzzy matching (one batched call for all remaining majors), then SequenceMatcher
+    string similarity. Each stage only sees what the earlier ones left undecided.
+    
+    Returns one score record per candidate. A record holds the component scores that
+    were computed, the final "similarity" and the stage that "decided_by" it; both stay
+    None when the semantic check still has to run. With stop_on_perfect, once any
+    major scores 1.0 the undecided ones are marked "skipped" and keep a similarity of
+    None: their fuzzy scores are partial and must not be read as a final score.
+    """
+    job_major_lower = job_major.lower()
     job_major_processed = preprocess_major(job_major)
-    candidate_major_processed = preprocess_major(candidate_major)
     
-    # Check basic string similarity (for typos and small variations)
-    string_sim = get_string_similarity(job_major_original, candidate_major_original)
+    records = []
+    for major in candidate_majors:
+        scores = {
+            "string": None,
+            "fuzzy_original": None,
+            "fuzzy_processed": None,
+            "semantic": None,
+            "similarity": None,
+            "decided_by": None
+        }
+        
+        # Identical apart from case
+        if major.lower() == job_major_lower:
+            scores.update(similarity=1.0, decided_by="exact")
+        
+        # For aliases that map to the same major
+        elif preprocess_major(major) == job_major_processed:
+            scores.update(similarity=1.0, decided_by="alias")
+        
+        records.append(scores)
     
-    # Check fuzzy matching (better for word order, plural forms, etc.)
-    fuzzy_sim_original = get_fuzzy_similarity(job_major_original, candidate_major_original)
-    fuzzy_sim_processed = get_fuzzy_similarity(job_major_processed, candidate_major_processed)
+    # Check fuzzy matching (better for word order, plural forms, etc.), all remaining majors per call
+    pending = [i for i, scores in enumerate(records) if scores["similarity"] is None]
+    fuzzy_original = get_fuzzy_similarities(job_major, [candidate_majors[i] for i in pending])
+    fuzzy_processed = get_fuzzy_similarities(job_major_processed, [preprocess_major(candidate_majors[i]) for i in pending])
     
-    # If direct fuzzy match is very high (likely same major with variations)
-    if fuzzy_sim_original > 0.9 or fuzzy_sim_processed > 0.9:
-        return max(fuzzy_sim_original, fuzzy_sim_processed)
+    for i, fuzzy_sim_original, fuzzy_sim_processed in zip(pending, fuzzy_original, fuzzy_processed):
+        records[i].update(fuzzy_original=float(fuzzy_sim_original), fuzzy_processed=float(fuzzy_sim_processed))
+        
+        # If direct fuzzy match is very high (likely same major with variations)
+        if fuzzy_sim_original > 0.9 or fuzzy_sim_processed > 0.9:
+            records[i].update(similarity=float(max(fuzzy_sim_original, fuzzy_sim_processed)), decided_by="fuzzy")
     
-    # For aliases that might map to the same major
-    if job_major_processed == candidate_major_processed:
-        return 1.0
+    perfect_found = stop_on_perfect and any(scores["similarity"] == 1.0 for scores in records)
     
-    # If strings are very similar (likely just case/spelling differences), give high score
-    if string_sim > 0.85:
-        return max(string_sim, 0.9)  # Ensure high similarity for near-matches
+    for i in pending:
+        scores = records[i]
+        if scores["similarity"] is not None:
+            continue
+        
+        # A perfect match elsewhere already settles the list, so stop refining this one
+        if perfect_found:
+            scores["decided_by"] = "skipped"
+            continue
+        
+        # Check basic string similarity (for typos and small variations)
+        string_sim = get_string_similarity(job_major, candidate_majors[i])
+        scores["string"] = string_sim
+        
+        # If strings are very similar (likely just case/spelling differences), give high score
+        if string_sim > 0.85:
+            scores.update(similarity=max(string_sim, 0.9), decided_by="string")  # Ensure high similarity for near-matches
+    
+    return records
+
+def apply_semantic_score(scores, semantic_sim):
+    """Complete a score record the cheap checks left undecided."""
+    scores["semantic"] = semantic_sim
+    
+    # The best similarity score from all methods
+    scores["similarity"] = max(scores["string"], scores["fuzzy_original"], scores["fuzzy_processed"], semantic_sim)
+    scores["decided_by"] = "semantic"
+    return scores
+
+def record_decisions(records):
+    """Count which stage decided each comparison."""
+    with decision_counts_lock:
+        decision_counts.update(scores["decided_by"] for scores in records)
+
+def apply_learned_scores(records, job_major_processed, candidate_majors):
+    """
+    Settle records of majors learned onto this very job major and return the rest still open.
+    
+    A learned major reuses the cosine it was learned with, which is the same semantic
+    score the model would give it.
+    """
+    pending = []
+    for i, scores in enumerate(records):
+        if scores["decided_by"] is not None:
+            continue
+        learned = learned_aliases.get(preprocess_major(candidate_majors[i]))
+        if learned and learned[0] == job_major_processed:
+            apply_semantic_score(scores, learned[1])
+            scores["decided_by"] = "learned"
+        else:
+            pending.append(i)
+    return pending
+
+def semantic_texts(job_major, candidate_majors, stop_on_perfect=False):
+    """Preprocessed majors score_majors_batch will embed for these arguments (empty if none)."""
+    job_major_processed = preprocess_major(job_major)
+    records = quick_compare_majors_batch(job_major, candidate_majors, stop_on_perfect)
+    pending = apply_learned_scores(records, job_major_processed, candidate_majors)
+    if not pending:
+        return []
     
-    # Use semantic meaning for less obvious matches
-    # Generate embeddings
-    embeddings = model.encode([job_major_processed, candidate_major_processed])
+    return [job_major_processed] + [preprocess_major(candidate_majors[i]) for i in pending]
+
+# Shared task embedding the taxonomy for the first requests, so they all wait on one batch
+taxonomy_prefetch = None
+
+async def prefetch_taxonomy():
+    """Await the taxonomy embeddings before get_major_taxonomy first needs them."""
+    global taxonomy_prefetch
+    if taxonomy is not None:
+        return
+    if taxonomy_prefetch is None:
+        taxonomy_prefetch = asyncio.ensure_future(encode_majors_async(taxonomy_majors()))
+    try:
+        await asyncio.shield(taxonomy_prefetch)
+    except Exception:
+        # Let the next request try again instead of failing on a stored error forever
+        taxonomy_prefetch = None
+        raise
+
+async def prefetch_embeddings(job_major, candidate_majors, stop_on_perfect=False):
+    """
+    Embed everything scoring these majors needs before the scoring itself runs.
+    
+    The cheap checks run in the threadpool and the model batch is awaited, so no
+    thread sits waiting on the model; the sync scoring that follows only hits the
+    embedding cache.
+    """
+    texts = await run_in_threadpool(semantic_texts, job_major, candidate_majors, stop_on_perfect)
+    if texts:
+        # Alias learning afterwards needs the taxonomy as well
+        await asyncio.gather(encode_majors_async(texts), prefetch_taxonomy())
+
+def score_majors_batch(job_major, candidate_majors, stop_on_perfect=False):
+    """Score many candidate majors; the ones the cheap checks cannot settle share one semantic batch."""
+    records = quick_compare_majors_batch(job_major, candidate_majors, stop_on_perfect)
+    job_major_processed = preprocess_major(job_major)
+    pending = apply_learned_scores(records, job_major_processed, candidate_majors)
+    
+    # Use semantic meaning for less obvious matches (embeddings cached per model and normalized major)
+    semantic_scores = semantic_similarities(
+        job_major_processed,
+        [preprocess_major(candidate_majors[i]) for i in pending]
+    )
+    for i, semantic_sim in zip(pending, semantic_scores):
+        apply_semantic_score(records[i], semantic_sim)
     
-    # Calculate cosine similarity
-    semantic_sim = cosine_similarity([embeddings[0]], [embeddings[1]])[0][0]
+    # Unknown candidate majors that resolved confidently are learned for next time;
+    # the job major is never learned, so a posting's requirement is not rewritten
+    if pending:
+        learn_aliases([preprocess_major(candidate_majors[i]) for i in pending])
     
-    # Return the best similarity score from all methods
-    return max(string_sim, fuzzy_sim_original, fuzzy_sim_processed, semantic_sim)
+    record_decisions(records)
+    return records
+
+def score_majors(job_major, candidate_major):
+    """Compare majors using multiple similarity methods and return the full score record."""
+    return score_majors_batch(job_major, [candidate_major])[0]
+
+def compare_majors(job_major, candidate_major):
+    """Compare majors using multiple similarity methods and return the best score."""
+    return score_majors(job_major, candidate_major)["similarity"]
 
 def compare_majors_list(job_major, candidate_majors):
     """
@@ -135,18 +677,22 @@ def compare_majors_list(job_major, candidate_majors):
             "all_matches": []
         }
     
-    # Compare each candidate major to the job major
+    # Cheap checks per major; the ones they cannot settle are scored semantically in one batch,
+    # unless one major already matches perfectly
+    records = score_majors_batch(job_major, candidate_majors, stop_on_perfect=True)
+    
+    # Collect the match details for each candidate major, keeping the score record for the report
     matches = []
-    for major in candidate_majors:
-        similarity = compare_majors(job_major, major)
+    for major, scores in zip(candidate_majors, records):
         matches.append({
             "major": major,
-            "similarity": similarity,
-            "normalized": preprocess_major(major)
+            "similarity": scores["similarity"],
+            "normalized": preprocess_major(major),
+            "scores": scores
         })
     
-    # Sort by similarity (highest first)
-    matches.sort(key=lambda x: x["similarity"], reverse=True)
+    # Sort by similarity (highest first), with majors skipped after a perfect match last
+    matches.sort(key=lambda x: (x["similarity"] is not None, x["similarity"] or 0.0), reverse=True)
     
     # Return best match and all matches
     return {
@@ -155,8 +701,12 @@ def compare_majors_list(job_major, candidate_majors):
         "all_matches": matches
     }
 
-def identify_relationship(job_major, candidate_major):
-    """Identify the relationship between majors for the report."""
+def identify_relationship(job_major, candidate_major, scores=None):
+    """
+    Identify the relationship between majors for the report.
+    
+    Reuses the score record from compare_majors when given, so nothing is rescored.
+    """
     job_processed = preprocess_major(job_major)
     candidate_processed = preprocess_major(candidate_major)
     
@@ -164,17 +714,10 @@ def identify_relationship(job_major, candidate_major):
     if job_processed == candidate_processed:
         return "equivalent majors"
     
-    # Calculate overall similarity (same logic as compare_majors)
-    string_sim = get_string_similarity(job_major, candidate_processed)
-    fuzzy_sim = get_fuzzy_similarity(job_processed, candidate_processed)
-    fuzzy_sim_orig = get_fuzzy_similarity(job_major, candidate_major)
-    
-    # Generate embeddings for semantic similarity
-    embeddings = model.encode([job_processed, candidate_processed])
-    semantic_sim = cosine_similarity([embeddings[0]], [embeddings[1]])[0][0]
-    
-    # Get best overall similarity score
-    overall_sim = max(string_sim, fuzzy_sim, fuzzy_sim_orig, semantic_sim)
+    # Overall similarity is the best of every component compare_majors computed
+    if scores is None:
+        scores = score_majors(job_major, candidate_major)
+    overall_sim = scores["similarity"]
     
     # Use overall similarity for relationship classification
     if overall_sim > 0.90:
@@ -186,13 +729,46 @@ def identify_relationship(job_major, candidate_major):
     else:
         return "different fields"
 
-def generate_major_report(job_major, candidate_major, similarity_score):
+def report_random(*inputs):
+    """Template chooser for a report: seeded from the inputs in deterministic mode."""
+    if not DETERMINISTIC_REPORTS:
+        return random
+    seed = hashlib.sha256(json.dumps(inputs, default=str).encode()).hexdigest()
+    return random.Random(int(seed, 16))
+
+def get_cached_report(key):
+    """Return a previously generated report, or None (always None outside deterministic mode)."""
+    if not DETERMINISTIC_REPORTS:
+        return None
+    with report_cache_lock:
+        report = report_cache.get(key)
+        if report is not None:
+            report_cache.move_to_end(key)
+        return report
+
+def store_report(key, report):
+    """Remember a generated report in the bounded report cache."""
+    if not DETERMINISTIC_REPORTS:
+        return
+    with report_cache_lock:
+        report_cache[key] = report
+        report_cache.move_to_end(key)
+        while len(report_cache) > REPORT_CACHE_SIZE:
+            report_cache.popitem(last=False)
+
+def generate_major_report(job_major, candidate_major, similarity_score, scores=None):
     """Generate a dynamic report on the similarity between majors."""
+    cache_key = ("major", job_major, candidate_major, round(float(similarity_score), 6))
+    report = get_cached_report(cache_key)
+    if report is not None:
+        return report
+    chooser = report_random(*cache_key)
+    
     # Round similarity score to percentage
     percentage = round(similarity_score * 100)
     
     # Get the relationship description based on the actual similarity score
-    relationship = identify_relationship(job_major, candidate_major)
+    relationship = identify_relationship(job_major, candidate_major, scores)
     
     # Debugging context for developing better relationship detection
     debug_info = ""
@@ -241,7 +817,8 @@ def generate_major_report(job_major, candidate_major, similarity_score):
         ]
     
     # Randomly select intro and interpretation for variety
-    report = f"{random.choice(intros)} {random.choice(interpretations)}"
+    report = f"{chooser.choice(intros)} {chooser.choice(interpretations)}"
+    store_report(cache_key, report)
     return report
 
 def generate_major_list_report(job_major, candidate_majors_result):
@@ -263,8 +840,16 @@ def generate_major_list_report(job_major, candidate_majors_result):
     if not best_match:
         return "No candidate majors were provided for comparison."
     
-    # Generate report for best match
-    best_match_report = generate_major_report(job_major, best_match, best_score)
+    cache_key = ("major_list", job_major, tuple(
+        (m["major"], None if m["similarity"] is None else round(float(m["similarity"]), 6)) for m in all_matches
+    ))
+    report = get_cached_report(cache_key)
+    if report is not None:
+        return report
+    chooser = report_random(*cache_key)
+    
+    # Generate report for best match (matches are sorted, so its score record comes first)
+    best_match_report = generate_major_report(job_major, best_match, best_score, all_matches[0].get("scores"))
     
     # If only one major, return that report
     if len(all_matches) == 1:
@@ -273,10 +858,11 @@ def generate_major_list_report(job_major, candidate_majors_result):
     # Generate additional context about multiple majors
     percentage = round(best_score * 100)
     
-    # Count how many majors have good alignment
-    good_matches = [m for m in all_matches if m["similarity"] >= 0.7]
-    moderate_matches = [m for m in all_matches if 0.5 <= m["similarity"] < 0.7]
-    weak_matches = [m for m in all_matches if m["similarity"] < 0.5]
+    # Count how many majors have good alignment; majors skipped after a perfect match have no score
+    scored_matches = [m for m in all_matches if m["similarity"] is not None]
+    good_matches = [m for m in scored_matches if m["similarity"] >= 0.7]
+    moderate_matches = [m for m in scored_matches if 0.5 <= m["similarity"] < 0.7]
+    weak_matches = [m for m in scored_matches if m["similarity"] < 0.5]
     
     # Create additional context for multiple majors
     multi_major_context = []
@@ -288,7 +874,7 @@ def generate_major_list_report(job_major, candidate_majors_result):
         f"From the candidate's multiple educational backgrounds, '{best_match}' shows the highest similarity ({percentage}%) to the required major."
     ]
     
-    multi_major_context.append(random.choice(multi_major_intros))
+    multi_major_context.append(chooser.choice(multi_major_intros))
     
     # Add context about other good matches if any
     if len(good_matches) > 1:
@@ -299,7 +885,7 @@ def generate_major_list_report(job_major, candidate_majors_result):
                 f"Other well-matched majors in the candidate's profile include: {', '.join(other_good)}.",
                 f"The candidate's educational background also includes other relevant majors: {', '.join(other_good)}."
             ]
-            multi_major_context.append(random.choice(other_good_text))
+            multi_major_context.append(chooser.choice(other_good_text))
     
     # Add interpretation about having multiple majors
     if len(good_matches) > 1:
@@ -308,17 +894,18 @@ def generate_major_list_report(job_major, candidate_majors_result):
             "The candidate's multiple related fields of study suggest breadth of knowledge that may be beneficial for this role.",
             "This multidisciplinary educational background may provide the candidate with unique perspectives relevant to the position."
         ]
-        multi_major_context.append(random.choice(multi_interpretation))
+        multi_major_context.append(chooser.choice(multi_interpretation))
     elif good_matches and moderate_matches:
         mixed_interpretation = [
             "The candidate's educational background shows some relevant majors but also includes less aligned fields.",
             "While the candidate's primary major aligns well, their other fields of study are less directly relevant to this position.",
             "The candidate demonstrates focus in one relevant area but has supplementary education in moderately related fields."
         ]
-        multi_major_context.append(random.choice(mixed_interpretation))
+        multi_major_context.append(chooser.choice(mixed_interpretation))
     
     # Combine reports
     combined_report = best_match_report + "\n\n" + "\n".join(multi_major_context)
+    store_report(cache_key, combined_report)
     return combined_report
 
 # Updated request and response models
@@ -335,11 +922,30 @@ class MajorComparisonResponse(BaseModel):
     all_matches: List[Dict]
     report: str
 
-# Original endpoint (for backward compatibility)
-@app.get("/compare")
-def compare(job_major: str, candidate_major: str):
-    similarity_score = compare_majors(job_major, candidate_major)
-    report = generate_major_report(job_major, candidate_major, similarity_score)
+class ApplicantMajors(BaseModel):
+    applicant_id: str
+    majors: List[str]
+
+class BulkMajorRequest(BaseModel):
+    job_major: str
+    applicants: List[ApplicantMajors]
+
+def major_key(major):
+    """Key under which identical majors from different applicants are scored only once."""
+    return major.lower().strip()
+
+def distinct_majors(applicants):
+    """Keys of every non-blank major across the applicants, first occurrence first."""
+    return list(dict.fromkeys(
+        major_key(major) for applicant in applicants for major in applicant.majors if major.strip()
+    ))
+
+# Endpoint bodies run in the threadpool after their embeddings were prefetched, so model
+# batches are awaited on the event loop rather than by a blocked thread
+def compare_response(job_major, candidate_major):
+    scores = score_majors(job_major, candidate_major)
+    similarity_score = scores["similarity"]
+    report = generate_major_report(job_major, candidate_major, similarity_score, scores)
     
     # Return normalized versions for reference
     job_major_normalized = preprocess_major(job_major)
@@ -354,14 +960,7 @@ def compare(job_major: str, candidate_major: str):
         "report": report
     }
 
-# New endpoint supporting multiple majors
-@app.post("/compare-majors")
-def compare_multiple_majors(request: MajorComparisonRequest):
-    """
-    Compare job major against multiple candidate majors
-    
-    Returns the best match along with scores for all majors
-    """
+def compare_multiple_majors_response(request):
     result = compare_majors_list(request.job_major, request.candidate_majors)
     
     # Get normalized version of job major
@@ -385,9 +984,97 @@ def compare_multiple_majors(request: MajorComparisonRequest):
         "report": report
     }
 
+def compare_majors_bulk_response(request):
+    distinct = distinct_majors(request.applicants)
+    scores = dict(zip(distinct, score_majors_batch(request.job_major, distinct)))
+    
+    ranking = []
+    for applicant in request.applicants:
+        best_match, best_score = None, 0.0
+        for major in applicant.majors:
+            if not major.strip():
+                continue
+            similarity = scores[major_key(major)]["similarity"]
+            if best_match is None or similarity > best_score:
+                best_match, best_score = major, similarity
+        
+        ranking.append({
+            "applicant_id": applicant.applicant_id,
+            "similarity": round(float(best_score), 3)*100,
+            "best_match": best_match,
+            "best_match_normalized": preprocess_major(best_match) if best_match else ""
+        })
+    
+    # Highest similarity first
+    ranking.sort(key=lambda x: x["similarity"], reverse=True)
+    
+    return {
+        "job_major": request.job_major,
+        "job_major_normalized": preprocess_major(request.job_major),
+        "distinct_majors": len(distinct),
+        "applicants": ranking
+    }
+
+def resolve_major_response(major):
+    closest, score = nearest_known_major(major)
+    return {
+        "major": major,
+        "normalized": preprocess_major(major),
+        "closest_major": closest,
+        "similarity": round(score, 3)
+    }
+
+# Original endpoint (for backward compatibility)
+@app.get("/compare")
+async def compare(job_major: str, candidate_major: str):
+    await prefetch_embeddings(job_major, [candidate_major])
+    return await run_in_threadpool(compare_response, job_major, candidate_major)
+
+# New endpoint supporting multiple majors
+@app.post("/compare-majors")
+async def compare_multiple_majors(request: MajorComparisonRequest):
+    """
+    Compare job major against multiple candidate majors
+    
+    Returns the best match along with scores for all majors
+    """
+    await prefetch_embeddings(request.job_major, request.candidate_majors, stop_on_perfect=True)
+    return await run_in_threadpool(compare_multiple_majors_response, request)
+
+# Bulk endpoint for screening a whole applicant pool against one job major
+@app.post("/compare-majors-bulk")
+async def compare_majors_bulk(request: BulkMajorRequest):
+    """
+    Rank many applicants by how well their majors match the job major
+    
+    Each distinct major across all applicants is scored once; applicants are then
+    ranked by their best-matching major. No reports are generated.
+    """
+    distinct = distinct_majors(request.applicants)
+    await prefetch_embeddings(request.job_major, distinct)
+    return await run_in_threadpool(compare_majors_bulk_response, request)
+
+# Resolve a major against the canonical major taxonomy
+@app.get("/resolve-major")
+async def resolve_major(major: str):
+    """Return the closest canonical major and its cosine similarity."""
+    await asyncio.gather(encode_majors_async([preprocess_major(major)]), prefetch_taxonomy())
+    return await run_in_threadpool(resolve_major_response, major)
+
+# Counters for how comparisons were decided
+@app.get("/stats")
+async def stats():
+    with decision_counts_lock:
+        counts = dict(decision_counts)
+    return {
+        "decided_by": counts,
+        "embedding_cache_size": len(embedding_cache),
+        "model_loaded": model is not None
+    }
+
 # New GET endpoint for multiple majors (for easier testing)
 @app.get("/compare-majors-list")
-def compare_majors_get(job_major: str, candidate_majors: str):
+async def compare_majors_get(job_major: str, candidate_majors: str):
     """
     Compare job major against multiple candidate majors via GET
     
@@ -405,7 +1092,7 @@ def compare_majors_get(job_major: str, candidate_majors: str):
     )
     
     # Use the POST endpoint
-    return compare_multiple_majors(request)
+    return await compare_multiple_majors(request)
 
 
 # uvicorn major_check:app --reload
@@ -1,32 +1,739 @@
 import pandas as pd
-import random
+import numpy as np
+import re
+import os
+import json
+import time
+import hashlib
+import threading
+from collections import OrderedDict, Counter, defaultdict
+from functools import lru_cache
+from contextlib import contextmanager, nullcontext
+from itertools import chain
 from fastapi import FastAPI
+from fastapi.responses import Response, StreamingResponse
+from pydantic import BaseModel, Field
+from typing import List, Optional
+
+try:
+    import pyarrow as pa
+    import pyarrow.feather as feather
+except ImportError:  # Without pyarrow the spreadsheet is parsed on every start
+    pa = None
+
+try:
+    import orjson
+except ImportError:  # The standard library encoder produces the same JSON, just slower
+    orjson = None
+
+try:
+    import fcntl
+except ImportError:  # Not available on Windows; workers then recompile independently
+    fcntl = None
 
 # Defining the FastAPI application
 app = FastAPI()
 
-# Loading the dataset
+# Number of questions handed out per questionnaire
+QUESTIONS_PER_TEST = 20
+
+# Shared random generator for all question draws
+rng = np.random.default_rng()
+
+# Upper bound on questionnaires generated for a single batch spec
+MAX_BATCH_COUNT = 1000
+
+# Word-level aliases applied before job role names are compared
+role_word_aliases = {
+    "dev": "developer",
+    "devs": "developer",
+    "developers": "developer",
+    "engineer": "developer",
+    "eng": "developer",
+    "programmer": "developer",
+    "fe": "frontend",
+    "be": "backend",
+    "apps": "app",
+    "analytics": "analyst",
+}
+
+# Minimum trigram similarity for a free-text role to be mapped onto a known role
+ROLE_MATCH_THRESHOLD = 0.6
+
+# Distinct free-text role strings whose resolution is remembered
+ROLE_CACHE_SIZE = 4096
+
+# Questionnaires generated per step while streaming an export
+EXPORT_CHUNK_SIZE = 100
+
+# Most candidates whose seen-question sets are kept in memory
+SEEN_STORE_SIZE = int(os.environ.get("SEEN_STORE_SIZE", "10000"))
+
+# Directory persisting seen-question sets across restarts (unset keeps them in memory only)
+SEEN_STORE_DIR = os.environ.get("SEEN_STORE_DIR")
+
+# Locks that candidates are spread over, so only candidates sharing one wait for each other
+SEEN_LOCK_STRIPES = 64
+
+# Source spreadsheet and its compiled Arrow copy, which is what workers actually load
 file_path = "QuestionDataset.xlsx"
-df = pd.read_excel(file_path, engine="openpyxl")
+cache_path = "QuestionDataset.arrow"
+
+# Bump whenever the layout of the compiled file changes
+CACHE_FORMAT_VERSION = 1
+
+def file_sha256(path):
+    """Hash a file's contents so a touched-but-unchanged spreadsheet keeps its cache."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 16), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def read_cache_metadata(cache):
+    """Return the metadata stored in the compiled file's schema, or None if unusable."""
+    try:
+        with pa.memory_map(cache) as source:
+            metadata = pa.ipc.open_file(source).schema.metadata or {}
+        return json.loads(metadata[b"question_bank"])
+    except (OSError, KeyError, ValueError, pa.ArrowInvalid):
+        return None
+
+def write_cache(frame, cache, metadata):
+    """Write the question bank as an uncompressed Arrow file so it can be memory-mapped."""
+    table = pa.Table.from_pandas(frame, preserve_index=False)
+    table = table.replace_schema_metadata({
+        **(table.schema.metadata or {}),
+        b"question_bank": json.dumps(metadata).encode(),
+    })
+
+    # Write to a private temp file first so concurrent workers never see a partial cache
+    tmp_path = f"{cache}.{os.getpid()}.tmp"
+    feather.write_feather(table, tmp_path, compression="uncompressed")
+    os.replace(tmp_path, cache)
+
+def read_fresh_cache(source, cache):
+    """Return the cached question bank if it still matches the spreadsheet, else None."""
+    metadata = read_cache_metadata(cache)
+    if not metadata or metadata.get("version") != CACHE_FORMAT_VERSION:
+        return None
+
+    stat = os.stat(source)
+    unchanged = metadata.get("mtime_ns") == stat.st_mtime_ns and metadata.get("size") == stat.st_size
+    if not unchanged and metadata.get("sha256") != file_sha256(source):
+        return None
+
+    # Memory-mapped read skips the XLSX parse; to_pandas still copies into this process
+    return feather.read_table(cache, memory_map=True).to_pandas()
+
+def load_question_bank(source=file_path, cache=cache_path):
+    """
+    Load the question dataset, preferring the compiled Arrow cache.
+
+    The cache is trusted when its format version matches and the spreadsheet's
+    mtime/size (or, failing that, its content hash) is unchanged. Otherwise the
+    XLSX is parsed once and the cache rewritten for every later start.
+    """
+    if pa is None:
+        return pd.read_excel(source, engine="openpyxl")
+
+    frame = read_fresh_cache(source, cache)
+    if frame is not None:
+        return frame
+
+    # Only one worker recompiles a changed spreadsheet; the others wait and reuse its cache
+    try:
+        lock = open(f"{cache}.lock", "w")
+    except OSError as e:
+        # Read-only working directory: parse the spreadsheet on every start instead
+        print(f"Error opening question bank cache lock: {e}")
+        return pd.read_excel(source, engine="openpyxl")
+
+    with lock:
+        if fcntl is not None:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+
+        frame = read_fresh_cache(source, cache)
+        if frame is not None:
+            return frame
+
+        stat = os.stat(source)
+        frame = pd.read_excel(source, engine="openpyxl")
+        try:
+            write_cache(frame, cache, {
+                "version": CACHE_FORMAT_VERSION,
+                "mtime_ns": stat.st_mtime_ns,
+                "size": stat.st_size,
+                "sha256": file_sha256(source),
+            })
+        except OSError as e:
+            print(f"Error writing question bank cache: {e}")
+        return frame
+
+# Loading the dataset
+df = load_question_bank()
+
+def encode_json(obj):
+    """Serialize to compact UTF-8 JSON bytes, using orjson when it is installed."""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode()
+
+def json_response(body):
+    """Wrap already-encoded JSON bytes so FastAPI does not serialize them again."""
+    return Response(content=body, media_type="application/json")
+
+def answer_mask(answer):
+    """Encode an answer such as "B" or "A, B, C, D" as a bitmask of options (A=1, B=2, C=4, D=8)."""
+    mask = 0
+    for letter in re.findall(r"[A-D]", str(answer).upper()):
+        mask |= 1 << (ord(letter) - ord("A"))
+    return mask
+
+def question_id(job_role, question):
+    """Stable id of a question, derived from its role and text rather than its row."""
+    text = f"{str(job_role).strip().lower()}\x1f{str(question).strip()}"
+    return hashlib.sha1(text.encode()).hexdigest()[:16]
+
+def normalize_role(role):
+    """Reduce a role name to a compact key, e.g. "Front-end Dev" -> "frontenddeveloper"."""
+    words = re.findall(r"[a-z0-9]+", role.lower())
+    return "".join(role_word_aliases.get(word, word) for word in words)
+
+def role_trigrams(key):
+    """Character trigrams of a compact role key, padded so short keys still match."""
+    padded = f"  {key} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+class RoleResolver:
+    """
+    Maps free-text job roles onto the known roles of the question bank.
+
+    Exact matches on the compact key are a dict lookup; anything else is scored
+    against a trigram inverted index (Dice coefficient). Resolutions, including
+    misses, are cached per input string.
+    """
+    def __init__(self, roles):
+        self.keys = {}
+        self.trigrams = {}
+        self.postings = defaultdict(list)
+
+        for role in roles:
+            key = normalize_role(role)
+            self.keys[key] = role
+            self.trigrams[role] = role_trigrams(key)
+            for gram in self.trigrams[role]:
+                self.postings[gram].append(role)
+
+        self.resolve = lru_cache(maxsize=ROLE_CACHE_SIZE)(self._resolve)
+
+    def _resolve(self, text):
+        """Return the known role closest to text, or None if nothing is close enough."""
+        key = normalize_role(text)
+        if not key:
+            return None
+        if key in self.keys:
+            return self.keys[key]
+
+        grams = role_trigrams(key)
+        overlap = Counter(role for gram in grams for role in self.postings.get(gram, ()))
+        scores = sorted(
+            ((2 * shared / (len(grams) + len(self.trigrams[role])), role) for role, shared in overlap.items()),
+            reverse=True,
+        )
+        if not scores or scores[0][0] < ROLE_MATCH_THRESHOLD:
+            return None
+
+        # Refuse to guess between equally close roles
+        if len(scores) > 1 and scores[1][0] == scores[0][0]:
+            return None
+        return scores[0][1]
+
+class QuestionIndex:
+    """
+    Read-only lookup structure built once from the question dataset.
+
+    Every question is converted to its record dict and pre-encoded JSON bytes up
+    front, and each job role (lowercased) maps to a compact array of the row
+    positions belonging to it, so a request never has to filter, convert or
+    re-serialize anything. The same positions are also bucketed per
+    (role, difficulty) for stratified draws.
+    """
+    def __init__(self, frame):
+        self.records = frame.to_dict(orient="records")
+
+        # Question ids survive rows being added, removed or reordered, so questionnaires
+        # handed out before a reload are still graded against the right answer keys
+        self.ids = {}
+        for position, record in enumerate(self.records):
+            base = qid = question_id(record["Job Role"], record["Question"])
+            repeat = 1
+            while qid in self.ids:  # The same question listed twice for one role
+                repeat += 1
+                qid = f"{base}-{repeat}"
+            record["Question ID"] = qid
+            self.ids[qid] = position
+        self.fragments = [encode_json(record) for record in self.records]
+
+        # Answer key and difficulty of every question as flat arrays for bulk grading
+        self.answer_keys = np.array([answer_mask(answer) for answer in frame["Correct Answer"]], dtype=np.uint8)
+        level_codes, self.level_names = pd.factorize(frame["Difficulty Level"].astype(str).str.strip())
+        self.level_codes = level_codes.astype(np.int32)
+
+        # Identifies this exact bank, since row positions only mean something within it
+        questions = "\x1f".join(frame["Question"].astype(str))
+        self.version = hashlib.sha1(questions.encode()).hexdigest()
+
+        role_keys = frame["Job Role"].astype(str).str.strip().str.lower()
+        self.roles = {
+            role: np.asarray(positions, dtype=np.int32)
+            for role, positions in role_keys.groupby(role_keys).indices.items()
+        }
+
+        # Display names of the roles plus free-text resolution onto them
+        self.role_names = {role: self.records[positions[0]]["Job Role"] for role, positions in self.roles.items()}
+        self.resolver = RoleResolver(self.roles)
+
+        level_keys = frame["Difficulty Level"].astype(str).str.strip().str.lower()
+        self.buckets = {
+            key: np.asarray(positions, dtype=np.int32)
+            for key, positions in frame.groupby([role_keys, level_keys]).indices.items()
+        }
+
+    def resolve_role(self, job_role):
+        """Return the index key of the known role matching job_role, or None."""
+        return self.resolver.resolve(job_role)
+
+    def positions(self, job_role):
+        """Return the row positions for a job role, or None if the role is unknown."""
+        role = self.resolve_role(job_role)
+        return None if role is None else self.roles[role]
+
+    def render(self, positions):
+        """Assemble the JSON array of the given questions from their cached fragments."""
+        return b"[" + b",".join([self.fragments[i] for i in positions]) + b"]"
+
+    def sample(self, job_role, n=QUESTIONS_PER_TEST, seen=None):
+        """Randomly pick up to n question positions for a job role (None if unknown)."""
+        positions = self.positions(job_role)
+        if positions is None:
+            return None
+
+        return draw_positions(positions, min(n, len(positions)), seen)
+
+    def sample_mix(self, job_role, mix, seen=None):
+        """
+        Draw questions following a difficulty mix such as {"medium": 12, "hard": 8}.
+
+        Raises ValueError when a difficulty bucket cannot supply the requested count.
+        """
+        role = self.resolve_role(job_role)
+        drawn = []
+        for level, count in mix.items():
+            bucket = self.buckets.get((role, level), np.empty(0, dtype=np.int32))
+            if count > len(bucket):
+                raise ValueError(f"Only {len(bucket)} '{level}' questions available for this job role.")
+            drawn.append(draw_positions(bucket, count, seen))
+
+        # Shuffle so the difficulties are interleaved rather than grouped
+        return rng.permutation(np.concatenate(drawn)) if drawn else np.empty(0, dtype=np.int32)
+
+    def sample_batch(self, job_role, count, generator, n=QUESTIONS_PER_TEST):
+        """
+        Draw count independent questionnaires for a job role in one vectorized step.
+
+        Each row of a (count, pool size) matrix of random keys is argsorted, so every
+        questionnaire is a draw without replacement from the role's pool. Returns
+        a (count, n) array of question positions.
+        """
+        positions = self.positions(job_role)
+        if positions is None:
+            return None
+
+        n = min(n, len(positions))
+        keys = generator.random((count, len(positions)))
+        return positions[np.argsort(keys, axis=1)[:, :n]]
+
+    def lookup(self, question_ids):
+        """Map question ids to row positions, with -1 for ids this bank does not know."""
+        return np.fromiter((self.ids.get(qid, -1) for qid in question_ids), dtype=np.int64)
+
+    def grade(self, owners, positions, chosen, count):
+        """
+        Score flattened answers of count submissions in one pass.
+
+        owners, positions (from lookup) and chosen (option bitmasks) are parallel arrays
+        with one entry per answer. An answer is correct when it selects at least one option
+        and only options from the answer key. Returns per-submission correct and valid-answer
+        counts, the same per difficulty level, and the number of unknown question ids.
+        """
+        valid = (positions >= 0) & (positions < len(self.records))
+        ids = np.where(valid, positions, 0)
+
+        keys = self.answer_keys[ids]
+        correct = valid & (chosen != 0) & ((chosen & ~keys) == 0)
+
+        levels = len(self.level_names)
+        cells = owners * levels + self.level_codes[ids]
+        correct_by_level = np.bincount(cells, weights=correct, minlength=count * levels).reshape(count, levels)
+        total_by_level = np.bincount(cells, weights=valid, minlength=count * levels).reshape(count, levels)
+        invalid = np.bincount(owners, weights=~valid, minlength=count)
+
+        return correct_by_level.sum(axis=1), total_by_level.sum(axis=1), correct_by_level, total_by_level, invalid
+
+def draw_positions(pool, count, seen=None):
+    """
+    Draw count distinct positions from pool.
+
+    With a seen bitset (one bool per question row) only unserved rows are drawn
+    and then marked; once the pool cannot cover the draw, its bits are cleared
+    and a new cycle starts. The cost depends on the pool size only, never on how
+    many attempts the candidate has made.
+    """
+    if seen is None:
+        return rng.choice(pool, size=count, replace=False)
+
+    unseen = pool[~seen[pool]]
+    if len(unseen) >= count:
+        chosen = rng.choice(unseen, size=count, replace=False)
+    else:
+        # Pool exhausted: serve the leftovers, then top up from a fresh cycle
+        seen[pool] = False
+        rest = pool[~np.isin(pool, unseen)]
+        chosen = np.concatenate([unseen, rng.choice(rest, size=count - len(unseen), replace=False)])
+
+    seen[chosen] = True
+    return rng.permutation(chosen)
+
+class SeenQuestionStore:
+    """
+    LRU-bounded map from candidate id to the bitset of question rows already served.
+
+    Bitsets are kept packed (one bit per question) and tagged with the bank
+    version they were built against, starting over when the bank changes. With a
+    directory set, each candidate's bitset is also written to disk so it survives
+    restarts and LRU eviction, and the file is the source of truth: a cached entry
+    is only used while the file is still the one this process last read or wrote,
+    so workers see each other's draws. Draws of one candidate are serialised
+    through candidate_lock, across threads and (with a directory) across worker
+    processes; the shared lock only guards the LRU itself and is never held
+    during disk I/O.
+    """
+    def __init__(self, capacity, directory=None):
+        self.capacity = capacity
+        self.directory = directory
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.stripes = [threading.Lock() for _ in range(SEEN_LOCK_STRIPES)]
+
+        if self.directory and not os.path.exists(self.directory):
+            os.makedirs(self.directory)
+
+    def _path(self, candidate_id):
+        return os.path.join(self.directory, hashlib.sha1(candidate_id.encode()).hexdigest() + ".npz")
+
+    def _signature(self, candidate_id):
+        """Identity of the candidate's file (a new inode after every replace), or None if absent."""
+        try:
+            stat = os.stat(self._path(candidate_id))
+        except OSError:
+            return None
+        return stat.st_ino, stat.st_mtime_ns
+
+    @contextmanager
+    def candidate_lock(self, candidate_id):
+        """Hold across one candidate's get, draw and put."""
+        # A stable hash, so every worker process picks the same stripe for a candidate
+        stripe = int(hashlib.sha1(candidate_id.encode()).hexdigest()[:8], 16) % len(self.stripes)
+        with self.stripes[stripe]:
+            if not self.directory or fcntl is None:
+                yield
+                return
+
+            # Other workers serialise on the same stripe's lock file
+            with open(os.path.join(self.directory, f"stripe-{stripe}.lock"), "w") as lock:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+                yield
+
+    def _load(self, candidate_id):
+        """Read a persisted (version, packed bitset, signature) entry, or None if there is none."""
+        signature = self._signature(candidate_id)
+        if signature is None:
+            return None
+        try:
+            with np.load(self._path(candidate_id)) as data:
+                return str(data["version"]), data["bits"], signature
+        except (OSError, KeyError, ValueError):
+            return None
+
+    def get(self, candidate_id, index):
+        """Return the candidate's bitset for this bank, unpacked into one bool per question."""
+        with self.lock:
+            entry = self.entries.get(candidate_id)
+
+        # Another worker may have drawn for this candidate since this process cached it
+        if self.directory and (entry is None or entry[2] != self._signature(candidate_id)):
+            entry = self._load(candidate_id)
+
+        size = len(index.records)
+        if entry is None or entry[0] != index.version:
+            return np.zeros(size, dtype=bool)
+
+        return np.unpackbits(entry[1], count=size).astype(bool)
+
+    def put(self, candidate_id, index, seen):
+        """Store the candidate's updated bitset."""
+        packed = np.packbits(seen)
+        signature = None
+        if self.directory:
+            path = self._path(candidate_id)
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, "wb") as f:
+                np.savez(f, version=index.version, bits=packed)
+            os.replace(tmp_path, path)
+            signature = self._signature(candidate_id)
+
+        with self.lock:
+            self.entries[candidate_id] = (index.version, packed, signature)
+            self.entries.move_to_end(candidate_id)
+            while len(self.entries) > self.capacity:
+                self.entries.popitem(last=False)
+
+def parse_difficulty_mix(difficulty_mix):
+    """Parse "easy:8,medium:8,hard:4" into {"easy": 8, "medium": 8, "hard": 4}."""
+    mix = {}
+    for part in difficulty_mix.split(","):
+        if not part.strip():
+            continue
+        level, _, count = part.partition(":")
+        if not count.strip().isdigit():
+            raise ValueError(f"Invalid difficulty mix entry '{part.strip()}', expected level:count.")
+        level = level.strip().lower()
+        mix[level] = mix.get(level, 0) + int(count)
+
+    if sum(mix.values()) == 0:
+        raise ValueError("The difficulty mix must request at least one question.")
+    return mix
+
+# Building the index once at startup
+question_index = QuestionIndex(df)
+
+# Questions already served to each candidate, for non-repeating retakes
+seen_store = SeenQuestionStore(SEEN_STORE_SIZE, SEEN_STORE_DIR)
+
+# Seconds between checks of the spreadsheet for edits (0 disables hot reload)
+RELOAD_INTERVAL = float(os.environ.get("QUESTION_RELOAD_INTERVAL", "5"))
+
+def source_signature(path):
+    """Cheap change detector for the spreadsheet."""
+    stat = os.stat(path)
+    return stat.st_mtime_ns, stat.st_size
+
+def reload_question_bank():
+    """Rebuild the question index from the current spreadsheet and swap it in."""
+    global df, question_index
+    frame = load_question_bank()
+    index = QuestionIndex(frame)
+
+    # Plain reference assignment: requests already holding the old index keep using it
+    df, question_index = frame, index
+
+def watch_question_bank(interval, signature):
+    """Poll the spreadsheet and reload the index in the background whenever it changes."""
+    while True:
+        time.sleep(interval)
+        try:
+            current = source_signature(file_path)
+            if current != signature:
+                reload_question_bank()
+                signature = current
+                print(f"Reloaded question bank: {len(question_index.records)} questions")
+        except Exception as e:
+            # A half-saved spreadsheet fails to parse; the next poll retries it
+            print(f"Error reloading question bank: {e}")
+
+if RELOAD_INTERVAL > 0:
+    threading.Thread(
+        target=watch_question_bank,
+        args=(RELOAD_INTERVAL, source_signature(file_path)),
+        daemon=True,
+    ).start()
 
 @app.get("/generate_questionnaire/")
-def generate_questionnaire(job_role: str):
+def generate_questionnaire(job_role: str, difficulty_mix: Optional[str] = None, candidate_id: Optional[str] = None):
     """
     Generates a questionnaire with 20 questions based on the selected job role.
     :param job_role: The job role selected by the candidate.
+    :param difficulty_mix: Optional per-difficulty counts, e.g. "medium:12,hard:8".
+    :param candidate_id: Optional candidate identifier; questions are not repeated across their attempts until the pool runs out.
     :return: List of 20 MCQs in JSON format.
     """
-    # Filtering questions for the selected job role
-    filtered_df = df[df["Job Role"].str.lower() == job_role.lower()]
-    
-    if filtered_df.empty:
+    # Holding one snapshot for the whole request in case a reload swaps the index
+    index = question_index
+    if index.positions(job_role) is None:
         return {"error": "No questions found for the given job role."}
-    
-    # Randomly selecting 20 questions from the filtered dataset
-    selected_questions = filtered_df.sample(n=20, random_state=random.randint(1, 1000)).to_dict(orient="records")
 
-    return {"questions": selected_questions}
+    try:
+        mix = None if difficulty_mix is None else parse_difficulty_mix(difficulty_mix)
+    except ValueError as e:
+        return {"error": str(e)}
+
+    # Serialising candidate draws so two concurrent attempts cannot overlap
+    with seen_store.candidate_lock(candidate_id) if candidate_id is not None else nullcontext():
+        seen = None if candidate_id is None else seen_store.get(candidate_id, index)
+
+        try:
+            if mix is None:
+                # Looking up the prebuilt questions for the selected job role
+                chosen = index.sample(job_role, seen=seen)
+            else:
+                # Drawing from the per-difficulty buckets of the selected job role
+                chosen = index.sample_mix(job_role, mix, seen=seen)
+        except ValueError as e:
+            return {"error": str(e)}
+
+        if seen is not None:
+            seen_store.put(candidate_id, index, seen)
+
+    # Echoing the matched role, since job_role may have been resolved from free text
+    role_name = index.role_names[index.resolve_role(job_role)]
+    return json_response(b'{"job_role":' + encode_json(role_name) + b',"questions":' + index.render(chosen) + b"}")
+
+# Request models for batch generation
+class QuestionnaireSpec(BaseModel):
+    job_role: str
+    count: int = Field(1, ge=1, le=MAX_BATCH_COUNT)
+    seed: Optional[int] = None
+
+class BatchQuestionnaireRequest(BaseModel):
+    specs: List[QuestionnaireSpec]
+
+@app.post("/generate_questionnaires/")
+def generate_questionnaires(request: BatchQuestionnaireRequest):
+    """
+    Generates many questionnaires in one call, e.g. for a cohort exam.
+    :param request: List of specs, each with a job role, how many questionnaires to build and an optional seed.
+    :return: One result per spec, holding its questionnaires or an error.
+    """
+    index = question_index
+    results = []
+    for spec in request.specs:
+        # A seeded spec always reproduces the same questionnaires
+        generator = rng if spec.seed is None else np.random.default_rng(spec.seed)
+        rows = index.sample_batch(spec.job_role, spec.count, generator)
+
+        if rows is None:
+            results.append(encode_json({"job_role": spec.job_role, "error": "No questions found for the given job role."}))
+        else:
+            questionnaires = b",".join([index.render(row) for row in rows])
+
+            # Echoing the matched role, as /generate_questionnaire/ does
+            role_name = index.role_names[index.resolve_role(spec.job_role)]
+            header = encode_json({"job_role": role_name, "seed": spec.seed})
+            results.append(header[:-1] + b',"questionnaires":[' + questionnaires + b"]}")
+
+    return json_response(b'{"results":[' + b",".join(results) + b"]}")
+
+# Request models for grading
+class Submission(BaseModel):
+    candidate_id: str
+    question_ids: List[str]
+    answers: List[str]
+
+class GradingRequest(BaseModel):
+    submissions: List[Submission]
+
+@app.post("/grade_questionnaires/")
+def grade_questionnaires(request: GradingRequest):
+    """
+    Grades many questionnaire submissions in one call.
+    :param request: Submissions, each a candidate id with parallel lists of question ids and chosen options (e.g. "B").
+    :return: Per-candidate score, percentage and per-difficulty breakdown.
+    """
+    index = question_index
+    submissions = request.submissions
+
+    for submission in submissions:
+        if len(submission.question_ids) != len(submission.answers):
+            return {"error": f"Submission for '{submission.candidate_id}' has a different number of question ids and answers."}
+
+    # Flattening every answer into parallel arrays so scoring is pure NumPy
+    lengths = np.array([len(s.question_ids) for s in submissions], dtype=np.int64)
+    total = int(lengths.sum())
+    owners = np.repeat(np.arange(len(submissions)), lengths)
+    positions = index.lookup(chain.from_iterable(s.question_ids for s in submissions))
+
+    # Each distinct answer string is decoded to an option bitmask only once
+    answers = np.array(list(chain.from_iterable(s.answers for s in submissions)), dtype=str)
+    distinct, inverse = np.unique(answers, return_inverse=True)
+    chosen = np.array([answer_mask(a) for a in distinct], dtype=np.uint8)[inverse.reshape(-1)] if total else np.zeros(0, dtype=np.uint8)
+
+    correct, answered, correct_by_level, total_by_level, invalid = index.grade(owners, positions, chosen, len(submissions))
+
+    results = []
+    for i, submission in enumerate(submissions):
+        results.append({
+            "candidate_id": submission.candidate_id,
+            "score": int(correct[i]),
+            "total": int(answered[i]),
+            "percentage": round(100 * correct[i] / answered[i], 2) if answered[i] else 0.0,
+            "by_difficulty": {
+                level: {"score": int(correct_by_level[i, j]), "total": int(total_by_level[i, j])}
+                for j, level in enumerate(index.level_names)
+                if total_by_level[i, j]
+            },
+            "invalid_questions": int(invalid[i]),
+        })
+
+    return {"results": results}
+
+def stream_pool(index, positions):
+    """Yield every question of a pool as one NDJSON line."""
+    for i in positions:
+        yield index.fragments[i] + b"\n"
+
+def stream_questionnaires(index, job_role, count, generator):
+    """Yield count generated questionnaires as NDJSON lines, building them a chunk at a time."""
+    number = 0
+    while number < count:
+        rows = index.sample_batch(job_role, min(EXPORT_CHUNK_SIZE, count - number), generator)
+        for row in rows:
+            yield b'{"questionnaire":%d,"questions":' % number + index.render(row) + b"}\n"
+            number += 1
+
+@app.get("/export_questions/")
+def export_questions(job_role: Optional[str] = None, questionnaires: Optional[int] = None, seed: Optional[int] = None):
+    """
+    Streams questions as NDJSON for offline exam packaging.
+    :param job_role: Role to export; omit to export the whole question bank.
+    :param questionnaires: If given, stream this many generated questionnaires for the role instead of its pool.
+    :param seed: Optional seed making the generated questionnaires reproducible.
+    :return: application/x-ndjson stream, one question (or questionnaire) per line.
+    """
+    index = question_index
+
+    if job_role is None:
+        if questionnaires is not None:
+            return {"error": "A job role is required to generate questionnaires."}
+        return StreamingResponse(stream_pool(index, range(len(index.records))), media_type="application/x-ndjson")
+
+    positions = index.positions(job_role)
+    if positions is None:
+        return {"error": "No questions found for the given job role."}
+
+    if questionnaires is None:
+        return StreamingResponse(stream_pool(index, positions), media_type="application/x-ndjson")
+
+    if questionnaires < 1:
+        return {"error": "The number of questionnaires must be at least 1."}
+
+    generator = rng if seed is None else np.random.default_rng(seed)
+    return StreamingResponse(
+        stream_questionnaires(index, job_role, questionnaires, generator),
+        media_type="application/x-ndjson",
+    )
 
 # To run the API, use: uvicorn questionnaire_model:app --reload
 # Call the API using a browser: http://127.0.0.1:8000/generate_questionnaire/?job_role=frontend developer
 # In the above link for job_role write the job role for which you need to get the questions
+# Stratified by difficulty: http://127.0.0.1:8000/generate_questionnaire/?job_role=data analyst&difficulty_mix=medium:12,hard:8
@@ -0,0 +1,15 @@
+import os
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# The services load their data files relative to the working directory
+os.chdir(ROOT)
+os.environ.setdefault("QUESTION_RELOAD_INTERVAL", "0")
+
+# Keep the services' on-disk caches out of the working tree
+os.environ.setdefault("MAJOR_EMBEDDING_CACHE_DIR", "")
+os.environ.setdefault("MAJOR_LEARNED_ALIASES_FILE", os.path.join(tempfile.mkdtemp(), "learned_major_aliases.json"))
+
+sys.path[:0] = [ROOT, os.path.join(ROOT, "py_services")]
@@ -0,0 +1,59 @@
+import pytest
+
+pytest.importorskip("sentence_transformers")
+
+import degree_check
+import major_check
+
+APPLICANTS = [
+    ("a1", ["BSc", "M.Tech"]),
+    ("a2", []),
+    ("a3", ["ph.d", " "]),
+    ("a4", ["Diploma", "bca", "Doctorate"]),
+    ("a5", ["B.E.", "BE"]),
+]
+
+@pytest.mark.parametrize("job_requirement", ["BTech", "MSc", "Diploma", "PhD"])
+def test_degree_bulk_matches_per_candidate_scoring(job_requirement):
+    result = degree_check.rank_applicants_degrees(job_requirement, APPLICANTS)
+    ranked = {entry["applicant_id"]: entry for entry in result["applicants"]}
+
+    for applicant_id, degrees in APPLICANTS:
+        degrees = [degree for degree in degrees if degree.strip()]
+        entry = ranked[applicant_id]
+        if not degrees:
+            assert entry["best_match"] is None and entry["similarity"] == 0.0
+            continue
+        expected = degree_check.compare_degrees_list(job_requirement, degrees)
+        assert entry["similarity"] == pytest.approx(expected["similarity"])
+        assert entry["best_match"] == expected["best_match"]
+
+    similarities = [entry["similarity"] for entry in result["applicants"]]
+    assert similarities == sorted(similarities, reverse=True)
+    assert result["distinct_degrees"] == 6
+    assert all("report" not in entry for entry in result["applicants"])
+
+def test_degree_bulk_reports_on_request():
+    result = degree_check.rank_applicants_degrees("BSc", [("a", ["PhD"]), ("b", [])], include_report=True)
+    assert all(entry["report"] for entry in result["applicants"])
+
+def test_major_bulk_matches_per_candidate_scoring():
+    request = major_check.BulkMajorRequest(job_major="Computer Science", applicants=[
+        major_check.ApplicantMajors(applicant_id="a1", majors=["CS", "History"]),
+        major_check.ApplicantMajors(applicant_id="a2", majors=[]),
+        major_check.ApplicantMajors(applicant_id="a3", majors=["computer science", "  "]),
+        major_check.ApplicantMajors(applicant_id="a4", majors=["Biology"]),
+    ])
+    result = major_check.compare_majors_bulk_response(request)
+    ranked = {entry["applicant_id"]: entry for entry in result["applicants"]}
+
+    assert result["distinct_majors"] == 4
+    assert ranked["a1"]["best_match"] == "CS" and ranked["a1"]["similarity"] == 100
+    assert ranked["a3"]["best_match"] == "computer science"
+    assert ranked["a2"]["best_match"] is None and ranked["a2"]["similarity"] == 0
+    assert ranked["a4"]["similarity"] == pytest.approx(
+        round(major_check.compare_majors("Computer Science", "Biology"), 3) * 100
+    )
+
+    similarities = [entry["similarity"] for entry in result["applicants"]]
+    assert similarities == sorted(similarities, reverse=True)
@@ -0,0 +1,24 @@
+import pytest
+
+pytest.importorskip("sentence_transformers")
+
+import degree_check
+
+def test_degree_rank_changes_reach_cached_scores(monkeypatch):
+    before = degree_check.degree_similarity("MBA", "BTech")
+    degree_check.get_degree_score("MBA")
+
+    monkeypatch.setitem(degree_check.degree_rank, "MBA", 4)
+    assert degree_check.get_degree_score("MBA") == 4
+    assert degree_check.get_degree_score("m.b.a.") == 4
+    assert degree_check.degree_similarity("MBA", "BTech") == 110
+    assert degree_check.degree_similarity("MBA", "BTech") != before
+
+    monkeypatch.setitem(degree_check.degree_synonyms, "Master of Business Administration", "MBA")
+    assert degree_check.normalize_degree("master of business administration") == "MBA"
+
+def test_lexicon_resolves_common_spellings():
+    for spelling in ["PhD", "ph.d", "Doctorate", "doctor of philosophy"]:
+        assert degree_check.normalize_degree(spelling) == "PhD"
+        assert degree_check.get_degree_score(spelling) == 6
+    assert degree_check.get_degree_score("M.Tech.") == degree_check.get_degree_score("Master of Technology") == 5
@@ -0,0 +1,50 @@
+import asyncio
+import time
+
+import numpy as np
+import pytest
+
+import major_check
+
+ALIAS_STRINGS = sorted(set(major_check.major_aliases) | set(major_check.major_aliases.values()))
+
+@pytest.mark.skipif(major_check.rapid_process is None, reason="rapidfuzz is not installed")
+def test_rapidfuzz_scores_match_fuzzywuzzy_on_aliases(monkeypatch):
+    fast = [major_check.get_fuzzy_similarities(query, ALIAS_STRINGS) for query in ALIAS_STRINGS]
+
+    # The pair-by-pair fuzzywuzzy path, as scored before rapidfuzz was introduced
+    monkeypatch.setattr(major_check, "rapid_process", None)
+    slow = [major_check.get_fuzzy_similarities(query, ALIAS_STRINGS) for query in ALIAS_STRINGS]
+
+    np.testing.assert_array_equal(np.array(fast), np.array(slow))
+
+def test_abbreviation_is_not_a_fuzzy_match():
+    assert major_check.get_fuzzy_similarities("Civil Engineering", ["EE"])[0] < 0.9
+
+def test_abbreviation_is_left_to_the_semantic_check():
+    pytest.importorskip("sentence_transformers")
+    assert major_check.compare_majors("Civil Engineering", "EE") < 0.9
+    assert major_check.score_majors("Civil Engineering", "EE")["decided_by"] == "semantic"
+
+class SlowModel:
+    def encode(self, texts):
+        time.sleep(0.2)
+        return np.ones((len(texts), 4))
+
+@pytest.mark.parametrize("cancel_after", [0.0, 0.1])
+def test_batcher_survives_cancelled_callers(monkeypatch, cancel_after):
+    batcher = major_check.EmbeddingBatcher(window_ms=20, max_batch_size=64)
+    monkeypatch.setattr(major_check, "embedding_batcher", batcher)
+    monkeypatch.setattr(major_check, "get_model", lambda: SlowModel())
+
+    async def cancel_one():
+        # Cancelled while still queued in the batch window, or while the model is encoding
+        task = asyncio.ensure_future(major_check.encode_majors_async([f"cancelled {cancel_after}"]))
+        await asyncio.sleep(cancel_after)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(cancel_one())
+    assert batcher.submit(["after"]).result(timeout=5).shape == (1, 4)
+    assert batcher.worker.is_alive()
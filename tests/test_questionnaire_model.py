@@ -0,0 +1,152 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import questionnaire_model as qm
+
+def make_frame(rows):
+    return pd.DataFrame(rows, columns=[
+        "Question", "Option A", "Option B", "Option C", "Option D",
+        "Correct Answer", "Job Role", "Difficulty Level",
+    ])
+
+BANK = make_frame([
+    ("Single key?", "a", "b", "c", "d", "B", "Data Analyst", "Easy"),
+    ("Multi key?", "a", "b", "c", "d", "A, C", "Data Analyst", "Hard"),
+    ("Other role?", "a", "b", "c", "d", "D", "Frontend Developer", "Easy"),
+])
+
+@pytest.fixture
+def index(monkeypatch):
+    index = qm.QuestionIndex(BANK)
+    monkeypatch.setattr(qm, "question_index", index)
+    return index
+
+def grade(submissions):
+    request = qm.GradingRequest(submissions=[qm.Submission(**s) for s in submissions])
+    return qm.grade_questionnaires(request)
+
+def ids(index):
+    return [record["Question ID"] for record in index.records]
+
+def test_question_ids_survive_rows_added_before_them():
+    before = qm.QuestionIndex(BANK)
+    extra = make_frame([("New question?", "a", "b", "c", "d", "A", "Data Analyst", "Easy")] * 25)
+    after = qm.QuestionIndex(pd.concat([extra, BANK], ignore_index=True))
+
+    for qid, record in zip(ids(before), before.records):
+        assert after.records[after.ids[qid]]["Question"] == record["Question"]
+
+def test_repeated_question_gets_distinct_ids():
+    index = qm.QuestionIndex(pd.concat([BANK, BANK.iloc[:1]], ignore_index=True))
+    assert len(set(ids(index))) == 4
+
+def test_grading_accepts_non_empty_subsets_of_the_key(index):
+    single, multi, _ = ids(index)
+    result = grade([{
+        "candidate_id": "c1",
+        "question_ids": [single, multi, multi, multi],
+        "answers": ["b", "A", "A, C", "A, B"],
+    }])["results"][0]
+
+    assert result["score"] == 3
+    assert result["total"] == 4
+    assert result["by_difficulty"] == {"Easy": {"score": 1, "total": 1}, "Hard": {"score": 2, "total": 3}}
+
+def test_grading_counts_blank_answers_as_wrong(index):
+    single = ids(index)[0]
+    result = grade([{"candidate_id": "c1", "question_ids": [single], "answers": [""]}])["results"][0]
+    assert (result["score"], result["total"]) == (0, 1)
+
+def test_grading_skips_unknown_question_ids(index):
+    single = ids(index)[0]
+    result = grade([{"candidate_id": "c1", "question_ids": [single, "missing", "0"], "answers": ["B", "B", "B"]}])["results"][0]
+
+    assert (result["score"], result["total"], result["invalid_questions"]) == (1, 1, 2)
+    assert result["percentage"] == 100.0
+
+def test_grading_empty_submissions(index):
+    results = grade([
+        {"candidate_id": "empty", "question_ids": [], "answers": []},
+        {"candidate_id": "c2", "question_ids": [ids(index)[2]], "answers": ["D"]},
+    ])["results"]
+
+    assert results[0] == {"candidate_id": "empty", "score": 0, "total": 0, "percentage": 0.0,
+                          "by_difficulty": {}, "invalid_questions": 0}
+    assert results[1]["score"] == 1
+    assert grade([]) == {"results": []}
+
+def test_grading_rejects_mismatched_lengths(index):
+    assert "error" in grade([{"candidate_id": "c1", "question_ids": ids(index)[:2], "answers": ["B"]}])
+
+def test_draw_positions_cycles_through_the_pool():
+    pool = np.arange(10, 20)
+    seen = np.zeros(30, dtype=bool)
+
+    first = qm.draw_positions(pool, 6, seen)
+    second = qm.draw_positions(pool, 4, seen)
+    assert sorted(np.concatenate([first, second])) == list(pool)
+    assert seen[pool].all() and not seen[:10].any()
+
+    # Exhausted pool: a new cycle starts instead of failing or repeating within a draw
+    third = qm.draw_positions(pool, 3, seen)
+    assert len(set(third)) == 3
+    assert seen[pool].sum() == 3
+
+def test_draw_positions_serves_leftovers_before_a_new_cycle():
+    pool = np.arange(5)
+    seen = np.array([True, True, True, False, False])
+
+    drawn = qm.draw_positions(pool, 3, seen)
+    assert {3, 4} <= set(drawn) and len(set(drawn)) == 3
+
+def test_role_resolver():
+    resolver = qm.RoleResolver(["frontend developer", "backend developer", "data analyst"])
+
+    assert resolver.resolve("Front-end Dev") == "frontend developer"
+    assert resolver.resolve("data analytics") == "data analyst"
+    assert resolver.resolve("frontend develper") == "frontend developer"
+    assert resolver.resolve("chef") is None
+    assert resolver.resolve("") is None
+
+def test_seen_store_keeps_packed_bitsets(tmp_path):
+    index = qm.QuestionIndex(BANK)
+    store = qm.SeenQuestionStore(capacity=1, directory=str(tmp_path))
+    seen = np.array([True, False, True])
+
+    store.put("c1", index, seen)
+    assert store.entries["c1"][1].dtype == np.uint8
+    store.put("c2", index, np.zeros(3, dtype=bool))
+
+    # Evicted from memory, read back from disk
+    assert "c1" not in store.entries
+    assert store.get("c1", index).tolist() == seen.tolist()
+    assert not store.get("unknown", index).any()
+
+@pytest.mark.parametrize("difficulty_mix", ["", " , ,", "easy:0,hard:0"])
+def test_empty_difficulty_mix_is_rejected(index, difficulty_mix):
+    assert "error" in qm.generate_questionnaire("Data Analyst", difficulty_mix=difficulty_mix)
+
+def test_batch_and_single_generation_echo_the_same_role(index):
+    single = qm.json.loads(qm.generate_questionnaire("data analytics").body)
+    request = qm.BatchQuestionnaireRequest(specs=[qm.QuestionnaireSpec(job_role="data analytics", count=2, seed=1)])
+    batch = qm.json.loads(qm.generate_questionnaires(request).body)["results"][0]
+
+    assert single["job_role"] == batch["job_role"] == "Data Analyst"
+    assert len(batch["questionnaires"]) == 2
+
+def test_seen_store_workers_share_draws_through_disk(tmp_path):
+    index = qm.QuestionIndex(pd.concat([BANK] * 4, ignore_index=True))
+    pool = index.roles["data analyst"]
+
+    # Two stores on one directory stand in for two worker processes
+    workers = [qm.SeenQuestionStore(capacity=10, directory=str(tmp_path)) for _ in range(2)]
+    served = []
+    for attempt in range(len(pool) // 2):
+        store = workers[attempt % 2]
+        with store.candidate_lock("c1"):
+            seen = store.get("c1", index)
+            served.extend(qm.draw_positions(pool, 2, seen))
+            store.put("c1", index, seen)
+
+    assert sorted(served) == sorted(pool)